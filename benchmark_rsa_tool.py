@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSA 工具性能基准
+按场景测量各项功能的耗时与吞吐量
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import itertools
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+
+from enhanced_rsa_tool import EnhancedRSATool
+import durable_io
+import envelope
+import key_bundle
+import key_export
+import keygen
+import key_registry
+import key_validation
+import key_vault
+import merkle_sign
+import oaep_stream
+import signing_load_test
+import verify_cache
+import x509_issuer
+
+def _timeit(func, iterations):
+    """执行 iterations 次并返回平均耗时 (秒)"""
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start_time) / iterations
+
+def _rss_bytes():
+    """当前进程常驻内存 (字节)，仅 Linux 可用，其他平台返回 None"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def bench_key_loading(key_size=2048, iterations=200):
+    """对比 PEM 双文件加载与密钥包加载的耗时"""
+    print(f"\n密钥加载基准 ({key_size} 位, {iterations} 次)")
+    print("-"*60)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rsa_tool = EnhancedRSATool(key_size)
+        rsa_tool.generate_key_pair(save_to_file=False)
+
+        private_file = os.path.join(temp_dir, "private_key.pem")
+        public_file = os.path.join(temp_dir, "public_key.pem")
+        bundle_file = os.path.join(temp_dir, "key_bundle.rsab")
+        rsa_tool.save_keys(private_file, public_file)
+        rsa_tool.save_key_bundle(bundle_file)
+
+        def load_pem():
+            with open(private_file, 'rb') as f:
+                serialization.load_pem_private_key(f.read(), password=None)
+            with open(public_file, 'rb') as f:
+                serialization.load_pem_public_key(f.read())
+
+        results = {
+            "PEM 双文件": _timeit(load_pem, iterations),
+            "密钥包 read": _timeit(lambda: key_bundle.load_key_bundle(bundle_file), iterations),
+            "密钥包 mmap": _timeit(
+                lambda: key_bundle.load_key_bundle(bundle_file, use_mmap=True), iterations
+            ),
+            "密钥包 免校验": _timeit(
+                lambda: key_bundle.load_key_bundle(bundle_file, validate=False), iterations
+            ),
+        }
+        for name, seconds in results.items():
+            print(f"{name:<12} {seconds * 1000:8.3f} 毫秒/次")
+        return results
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def bench_unlock_cache(key_size=2048, iterations=20, kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS):
+    """测量加密私钥的解锁开销以及解锁缓存摊销后的成本"""
+    print(f"\n解锁缓存基准 ({key_size} 位, KDF {kdf_rounds} 轮, {iterations} 次)")
+    print("-"*60)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rsa_tool = EnhancedRSATool(key_size)
+        rsa_tool.generate_key_pair(save_to_file=False)
+        private_file = os.path.join(temp_dir, "private_key.pem")
+        public_file = os.path.join(temp_dir, "public_key.pem")
+        rsa_tool.save_keys(private_file, public_file, password="benchmark", kdf_rounds=kdf_rounds)
+
+        cold = _timeit(
+            lambda: key_vault.load_pem_private_key_file(private_file, "benchmark"), iterations
+        )
+
+        cache = key_vault.UnlockCache(ttl=3600)
+        cache.get_or_load(private_file, "benchmark", key_vault.load_pem_private_key_file)
+        warm = _timeit(
+            lambda: cache.get_or_load(private_file, "benchmark", key_vault.load_pem_private_key_file),
+            iterations * 100
+        )
+
+        print(f"未缓存解锁     {cold * 1000:10.3f} 毫秒/次")
+        print(f"缓存命中       {warm * 1000:10.3f} 毫秒/次")
+        results = {"cold": cold, "cached": warm}
+        for operations in (1, 10, 100, 1000):
+            amortised = (cold + warm * (operations - 1)) / operations
+            results[f"amortised_{operations}"] = amortised
+            print(f"摊销 ({operations:>4} 次操作) {amortised * 1000:8.3f} 毫秒/次")
+        return results
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def bench_envelope(key_size=2048, recipients=64, payload_size=64 * 1024, iterations=5):
+    """测量多接收者数字信封的串行与并行包装耗时"""
+    print(f"\n数字信封基准 ({key_size} 位, {recipients} 个接收者, {payload_size} 字节, {iterations} 次)")
+    print("-"*60)
+
+    # 接收者公钥可以重复使用同一个密钥的不同对象，这里生成少量密钥循环使用
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    distinct = [rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+                for _ in range(8)]
+    public_keys = [distinct[i % len(distinct)].public_key() for i in range(recipients)]
+    payload = os.urandom(payload_size)
+
+    results = {
+        "串行包装": _timeit(
+            lambda: envelope.encrypt_for_recipients(payload, public_keys, max_workers=1), iterations
+        ),
+        "并行包装": _timeit(
+            lambda: envelope.encrypt_for_recipients(payload, public_keys), iterations
+        ),
+    }
+    for name, seconds in results.items():
+        print(f"{name:<10} {seconds * 1000:10.3f} 毫秒/信封")
+    return results
+
+def bench_oaep_stream(key_size=2048, payload_size=256 * 1024, iterations=3):
+    """测量分块 RSA-OAEP 流的串行与多线程吞吐量"""
+    print(f"\n分块 OAEP 流基准 ({key_size} 位, {payload_size} 字节, {iterations} 次)")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    rsa_tool.generate_key_pair(save_to_file=False)
+    payload = os.urandom(payload_size)
+    stream = oaep_stream.encrypt_bytes(payload, rsa_tool.public_key)
+
+    results = {}
+    for workers in (1, None):
+        label = "串行" if workers == 1 else "多线程"
+        encrypt = _timeit(
+            lambda: oaep_stream.encrypt_bytes(payload, rsa_tool.public_key, max_workers=workers),
+            iterations
+        )
+        decrypt = _timeit(
+            lambda: oaep_stream.decrypt_bytes(stream, rsa_tool.private_key, max_workers=workers),
+            iterations
+        )
+        results[f"{label}加密"] = payload_size / encrypt
+        results[f"{label}解密"] = payload_size / decrypt
+    for name, throughput in results.items():
+        print(f"{name:<10} {throughput / 1024:10.1f} KiB/秒")
+    return results
+
+def bench_verify_cache(key_size=2048, iterations=2000):
+    """对比重复验证同一签名时有无验证缓存的耗时"""
+    print(f"\n验证缓存基准 ({key_size} 位, {iterations} 次)")
+    print("-"*60)
+
+    signer = EnhancedRSATool(key_size)
+    signer.generate_key_pair(save_to_file=False)
+    message = "gateway token"
+    signature = signer.sign_message(message)
+
+    uncached = EnhancedRSATool(key_size)
+    uncached.public_key = signer.public_key
+    cache = verify_cache.VerificationCache()
+    cached = EnhancedRSATool(key_size, verify_cache=cache)
+    cached.public_key = signer.public_key
+
+    # verify_signature 会打印结果，测量时丢弃输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {
+            "无缓存": _timeit(lambda: uncached.verify_signature(message, signature), iterations),
+            "有缓存": _timeit(lambda: cached.verify_signature(message, signature), iterations),
+        }
+    for name, seconds in results.items():
+        print(f"{name:<8} {seconds * 1e6:10.1f} 微秒/次")
+    stats = cache.stats()
+    print(f"命中率: {stats['hit_rate']:.2%}  条目: {stats['entries']}  估算内存: {stats['approx_bytes']} 字节")
+    return results
+
+def bench_x509_batch(key_size=2048, count=1000):
+    """测量本地 CA 批量签发叶子证书的吞吐量 (证书/秒)"""
+    print(f"\n证书批量签发基准 ({key_size} 位 CA, {count} 张证书)")
+    print("-"*60)
+
+    ca_tool = EnhancedRSATool(key_size)
+    ca_tool.generate_key_pair(save_to_file=False)
+    ca = ca_tool.create_local_ca("Benchmark CA")
+
+    # 叶子证书的公钥签发测量与公钥来源无关，循环使用少量密钥
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    leaf_keys = [rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+                 for _ in range(8)]
+    subjects = [leaf_keys[i % len(leaf_keys)] for i in range(count)]
+    template = x509_issuer.CertificateTemplate(dns_names=["host-{index}.example"])
+
+    results = {}
+    for processes in (1, None):
+        label = "单进程" if processes == 1 else f"进程池 ({os.cpu_count()} 进程)"
+        start_time = time.perf_counter()
+        x509_issuer.issue_batch(ca, subjects, io.BytesIO(), template, processes=processes)
+        results[label] = count / (time.perf_counter() - start_time)
+    for name, rate in results.items():
+        print(f"{name:<16} {rate:10.1f} 证书/秒")
+    return results
+
+def bench_merkle(key_size=2048, count=10000):
+    """对比逐条签名与 Merkle 批量签名的耗时和存储开销"""
+    print(f"\nMerkle 批量签名基准 ({key_size} 位, {count} 条记录)")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    rsa_tool.generate_key_pair(save_to_file=False)
+    records = [f"audit record {i}" for i in range(count)]
+
+    # 逐条签名只抽样测量，按记录数外推
+    sample = min(count, 200)
+    per_record = _timeit(lambda: rsa_tool.sign_message(records[0]), sample)
+
+    start_time = time.perf_counter()
+    batch = rsa_tool.sign_batch(records)
+    proofs = list(batch.proofs())
+    batch_time = time.perf_counter() - start_time
+
+    cache = verify_cache.VerificationCache()
+    verifier = merkle_sign.MerkleVerifier(rsa_tool.public_key, cache)
+    batch_signature = batch.batch_signature()
+    start_time = time.perf_counter()
+    for record, proof in zip(records, proofs):
+        verifier.verify(record, proof, batch_signature)
+    verify_time = (time.perf_counter() - start_time) / count
+
+    signature_size = key_size // 8
+    proof_size = sum(len(proof) for proof in proofs) / count
+    print(f"逐条签名 (外推)   {per_record * count:10.3f} 秒, {signature_size} 字节/条")
+    print(f"批量签名 + 证明   {batch_time:10.3f} 秒, {proof_size:.0f} 字节/条 + {len(batch_signature)} 字节/批")
+    print(f"整批保存 (按需生成证明) {len(batch_signature) / count:6.2f} 字节/条")
+    print(f"单条验证 (缓存)   {verify_time * 1e6:10.1f} 微秒/条")
+    return {"per_record": per_record * count, "batch": batch_time, "verify": verify_time}
+
+def bench_key_registry(key_size=2048, count=1000000, object_sample=10000):
+    """测量紧凑公钥注册表每个公钥的内存占用，并与完整公钥对象对比"""
+    print(f"\n公钥注册表基准 ({key_size} 位, {count} 个公钥)")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    rsa_tool.generate_key_pair(save_to_file=False)
+    template = bytearray(rsa_tool.public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+
+    # 生成一百万个真实 RSA 密钥不现实：改写模数的低位字节 (保持最低字节为奇数)
+    # 得到结构合法、互不相同的 DER，足以测量存储开销
+    def synthetic_ders(n):
+        for i in range(n):
+            template[-14:-6] = i.to_bytes(8, 'big')
+            yield bytes(template)
+
+    # 对照组: 直接持有 cryptography 公钥对象
+    rss_before = _rss_bytes()
+    objects = [serialization.load_der_public_key(der) for der in synthetic_ders(object_sample)]
+    rss_after = _rss_bytes()
+    object_bytes = None
+    if rss_before is not None and rss_after is not None:
+        object_bytes = (rss_after - rss_before) / len(objects)
+    del objects
+
+    registry = key_registry.PublicKeyRegistry()
+    rss_before = _rss_bytes()
+    start_time = time.perf_counter()
+    registry.extend(synthetic_ders(count))
+    load_time = time.perf_counter() - start_time
+    rss_after = _rss_bytes()
+
+    fingerprints = list(itertools.islice(registry.fingerprints(), 0, count, max(1, count // 1000)))
+    der_time = _timeit(lambda: registry.get_der(fingerprints[0]), 1000)
+    start_time = time.perf_counter()
+    for fingerprint in fingerprints:
+        registry.get(fingerprint)
+    lazy_time = (time.perf_counter() - start_time) / len(fingerprints)
+
+    stats = registry.stats()
+    print(f"载入 {count} 个公钥     {load_time:10.3f} 秒 ({count / load_time:,.0f} 个/秒)")
+    print(f"DER 平均长度            {stats['der_bytes'] / count:10.1f} 字节")
+    print(f"注册表估算内存          {stats['bytes_per_key']:10.1f} 字节/公钥")
+    if rss_before is not None and rss_after is not None:
+        print(f"注册表实测 RSS 增量     {(rss_after - rss_before) / count:10.1f} 字节/公钥")
+    if object_bytes is not None:
+        print(f"完整公钥对象 RSS 增量   {object_bytes:10.1f} 字节/公钥 (抽样 {object_sample} 个)")
+    print(f"按指纹读取 DER          {der_time * 1e6:10.2f} 微秒")
+    print(f"首次创建公钥对象        {lazy_time * 1e6:10.2f} 微秒")
+    return {"bytes_per_key": stats["bytes_per_key"], "object_bytes": object_bytes, "load": load_time}
+
+def bench_key_validation(key_size=2048, count=1000, pairwise_sample=200):
+    """对比批量 GCD 与两两 GCD 检测共享素因子的耗时，并测量廉价策略检查与提前拒绝的收益"""
+    print(f"\n批量密钥校验基准 ({key_size} 位, {count} 个模数)")
+    print("-"*60)
+
+    # 生成大量真实密钥代价过高：用随机奇数模拟模数 (耗时只取决于位数)，并植入一对共享因子
+    rng = random.Random(2048)
+    half = key_size // 2
+    moduli = [rng.getrandbits(key_size) | (1 << (key_size - 1)) | 1 for _ in range(count)]
+    shared = rng.getrandbits(half) | (1 << (half - 1)) | 1
+    moduli[1] = shared * (rng.getrandbits(half) | (1 << (half - 1)) | 1)
+    moduli[-1] = shared * (rng.getrandbits(half) | (1 << (half - 1)) | 1)
+
+    policy = key_validation.KeyPolicy(min_key_size=key_size - 1)
+    check_time = _timeit(lambda: policy.check(moduli[0], 65537), 1000)
+
+    start_time = time.perf_counter()
+    found = key_validation.find_shared_factors(moduli)
+    batch_time = time.perf_counter() - start_time
+
+    # 两两 GCD 只抽样测量，按 n(n-1)/2 外推
+    sample = moduli[:pairwise_sample]
+    start_time = time.perf_counter()
+    for i, a in enumerate(sample):
+        for b in sample[i + 1:]:
+            math.gcd(a, b)
+    pair_time = (time.perf_counter() - start_time) / (len(sample) * (len(sample) - 1) / 2)
+    pairwise_time = pair_time * count * (count - 1) / 2
+
+    weak_tool = EnhancedRSATool(1024)
+    with contextlib.redirect_stdout(io.StringIO()):
+        weak_tool.generate_key_pair(save_to_file=False)
+    weak_pem = key_vault.private_key_to_pem(weak_tool.private_key)
+    strict = key_validation.KeyPolicy(min_key_size=key_size)
+
+    def reject_weak():
+        try:
+            key_validation.load_private_key_checked(weak_pem, policy=strict)
+        except ValueError:
+            pass
+
+    reject_time = _timeit(reject_weak, 50)
+    full_time = _timeit(lambda: serialization.load_pem_private_key(weak_pem, password=None), 50)
+
+    print(f"策略检查                {check_time * 1e6:10.2f} 微秒/密钥")
+    # 随机奇数之间本身也会有小公因子，这里只确认植入的因子被找到
+    detected = "已发现" if all(found.get(i, 1) % shared == 0 for i in (1, count - 1)) else "未发现"
+    print(f"批量 GCD                {batch_time:10.3f} 秒 (植入的共享因子{detected})")
+    print(f"两两 GCD (外推)         {pairwise_time:10.3f} 秒")
+    print(f"加速比                  {pairwise_time / batch_time:10.1f}x")
+    print(f"弱私钥提前拒绝          {reject_time * 1e3:10.3f} 毫秒 (完整加载 {full_time * 1e3:.3f} 毫秒)")
+    return {"batch": batch_time, "pairwise": pairwise_time, "reject": reject_time, "full": full_time}
+
+def bench_key_export(key_size=2048, count=5000, formats=("b64",)):
+    """对比逐个构建完整信息字符串与流式导出公钥清单的耗时"""
+    print(f"\n公钥清单导出基准 ({key_size} 位, {count} 个公钥, 格式 {'/'.join(formats)})")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rsa_tool.generate_key_pair(save_to_file=False)
+    template = bytearray(rsa_tool.public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    ))
+    public_keys = []
+    for i in range(count):
+        template[-14:-6] = i.to_bytes(8, 'big')
+        public_keys.append(serialization.load_der_public_key(bytes(template)))
+
+    def build_strings(out):
+        # 原有方式: 每个公钥多次序列化，构建十进制模数、Base64、十六进制字符串后整体写出
+        lines = []
+        for public_key in public_keys:
+            numbers = public_key.public_numbers()
+            der = public_key.public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )
+            lines.append(str(numbers.n))
+            lines.append(base64.b64encode(public_key.public_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            )).decode('utf-8'))
+            lines.append(der.hex())
+        out.write("\n".join(lines).encode('utf-8'))
+
+    with open(os.devnull, 'wb') as out:
+        strings_time = _timeit(lambda: build_strings(out), 1)
+        stream_time = _timeit(lambda: key_export.export_public_keys(public_keys, out, formats), 1)
+
+    print(f"构建完整字符串          {strings_time * 1e6 / count:10.2f} 微秒/公钥")
+    print(f"流式导出                {stream_time * 1e6 / count:10.2f} 微秒/公钥")
+    print(f"加速比                  {strings_time / stream_time:10.1f}x")
+    return {"strings": strings_time, "stream": stream_time}
+
+def bench_durable_write(key_size=2048, count=200):
+    """对比直接写文件、逐个持久化写入与批量持久化写入 count 对密钥文件的耗时"""
+    print(f"\n密钥文件持久化写入基准 ({key_size} 位, {count} 对密钥文件)")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rsa_tool.generate_key_pair(save_to_file=False)
+    private_pem = key_vault.private_key_to_pem(rsa_tool.private_key)
+    public_pem = rsa_tool.public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+    def plain(directory):
+        for i in range(count):
+            for name, data in ((f"private_{i}.pem", private_pem), (f"public_{i}.pem", public_pem)):
+                with open(os.path.join(directory, name), 'wb') as f:
+                    f.write(data)
+
+    def durable(directory, writer):
+        for i in range(count):
+            with durable_io.batch(writer) as batch_writer:
+                batch_writer.write(os.path.join(directory, f"private_{i}.pem"), private_pem,
+                                   durable_io.PRIVATE_FILE_MODE)
+                batch_writer.write(os.path.join(directory, f"public_{i}.pem"), public_pem,
+                                   durable_io.PUBLIC_FILE_MODE)
+
+    def batched(directory):
+        with durable_io.BatchWriter() as writer:
+            durable(directory, writer)
+
+    results = {}
+    for label, func in (("直接写入 (无 fsync)", plain),
+                        ("逐对持久化写入", lambda d: durable(d, None)),
+                        ("批量持久化写入", batched)):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            elapsed = _timeit(lambda: func(temp_dir), 1)
+        finally:
+            shutil.rmtree(temp_dir)
+        results[label] = elapsed
+        print(f"{label:<16}{elapsed:10.3f} 秒 ({elapsed * 1e3 / count:.3f} 毫秒/对)")
+    return results
+
+def bench_tree_manifest(key_size=2048, count=2000, file_size=16 * 1024, changed=20):
+    """对比逐文件签名与目录树清单签名的耗时，以及只修改少量文件时增量重新签名的耗时"""
+    print(f"\n目录树签名基准 ({key_size} 位, {count} 个 {file_size // 1024} KB 文件)")
+    print("-"*60)
+
+    rsa_tool = EnhancedRSATool(key_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rsa_tool.generate_key_pair(save_to_file=False)
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        root = os.path.join(temp_dir, "release")
+        paths = []
+        for i in range(count):
+            directory = os.path.join(root, f"dir{i % 20:02d}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"artifact_{i}.bin")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(file_size))
+            # 修改时间设为一小时前，使增量签名可以复用摘要
+            mtime = os.stat(path).st_mtime - 3600
+            os.utime(path, (mtime, mtime))
+            paths.append(path)
+
+        def per_file():
+            for path in paths:
+                with open(path, 'rb') as f:
+                    content = f.read()
+                rsa_tool.sign_message(base64.b64encode(content).decode('ascii'),
+                                      path + ".bin.sig")
+
+        signatures_dir = os.path.join(temp_dir, "signatures")
+        with contextlib.redirect_stdout(io.StringIO()):
+            per_file_time = _timeit(per_file, 1)
+        for path in paths:
+            os.remove(path + ".bin.sig")
+        os.makedirs(signatures_dir)
+
+        manifest = os.path.join(signatures_dir, "MANIFEST.sha256")
+        serial_time = _timeit(lambda: rsa_tool.sign_tree(root, manifest, max_workers=1,
+                                                          incremental=False), 1)
+        parallel_time = _timeit(lambda: rsa_tool.sign_tree(root, manifest, incremental=False), 1)
+
+        for path in paths[:changed]:
+            with open(path, 'r+b') as f:
+                f.write(os.urandom(16))
+            mtime = os.stat(path).st_mtime - 3600
+            os.utime(path, (mtime, mtime))
+        incremental_stats = {}
+        incremental_time = _timeit(
+            lambda: incremental_stats.update(rsa_tool.sign_tree(root, manifest)), 1
+        )
+        verify_time = _timeit(lambda: rsa_tool.verify_tree(root, manifest), 1)
+    finally:
+        shutil.rmtree(temp_dir)
+
+    print(f"逐文件签名          {per_file_time:8.3f} 秒 ({count} 次私钥运算, {count} 个签名文件)")
+    print(f"清单签名 (单线程)   {serial_time:8.3f} 秒 (1 次私钥运算)")
+    print(f"清单签名 (多线程)   {parallel_time:8.3f} 秒")
+    print(f"增量重新签名        {incremental_time:8.3f} 秒 (重新计算 {incremental_stats['hashed']} 个，"
+          f"复用 {incremental_stats['reused']} 个)")
+    print(f"并行验证            {verify_time:8.3f} 秒")
+    print(f"加速比 (逐文件/增量): {per_file_time / incremental_time:.1f}x")
+    return {
+        "per_file": per_file_time,
+        "manifest_serial": serial_time,
+        "manifest_parallel": parallel_time,
+        "incremental": incremental_time,
+        "verify": verify_time,
+    }
+
+def bench_keygen(key_size=2048, count=8, pool_size=4):
+    """按密钥长度 (key_size 与 key_size + 1024) 对比各密钥生成引擎的耗时分布、尝试次数与预生成池的等待时间"""
+    print(f"\n密钥生成引擎基准 (每种组合 {count} 个密钥)")
+    print("-"*60)
+
+    results = {}
+    for size in (key_size, key_size + 1024):
+        stats = keygen.KeygenStats()
+        for name in keygen.ENGINES:
+            engine = keygen.create_engine(name, stats)
+            for _ in range(count):
+                engine.generate(size)
+
+        # 预生成池: 调用方只付取出密钥的时间，生成代价转移到后台线程
+        pool = keygen.PooledKeygen(key_size=size, size=pool_size, stats=stats)
+        try:
+            for _ in range(count):
+                while pool.available() < 1:
+                    time.sleep(0.001)
+                pool.generate(size)
+        finally:
+            pool.close()
+
+        for name, entry in stats.summary().items():
+            attempts = entry["mean_attempts"]
+            attempts_text = f"{attempts:8.1f}" if attempts is not None else f"{'-':>8}"
+            print(f"{name:<14} 平均 {entry['mean_seconds'] * 1e3:9.2f} 毫秒  "
+                  f"中位 {entry['p50_seconds'] * 1e3:9.2f} 毫秒  "
+                  f"最大 {entry['max_seconds'] * 1e3:9.2f} 毫秒  候选数 {attempts_text}")
+            results[name] = entry
+    print("注: cryptography 不支持多素数 RSA 私钥，所有引擎生成的都是双素数密钥，私钥运算速度相同")
+    return results
+
+def bench_signing_server(key_size=2048, requests=2000, connections=8):
+    """对比本地 HTTP 签名服务在保持连接/每请求新建连接、不同批处理窗口下的吞吐量与尾延迟"""
+    print(f"\n本地 HTTP 签名服务基准 ({key_size} 位, {connections} 个连接, {requests} 个签名请求)")
+    print("-"*60)
+
+    results = {}
+    for label, batch_window, keep_alive in (("保持连接, 窗口 0 毫秒", 0.0, True),
+                                            ("保持连接, 窗口 2 毫秒", 0.002, True),
+                                            ("每请求新建连接, 窗口 2 毫秒", 0.002, False)):
+        with signing_load_test.local_server(key_size, batch_window=batch_window) as (host, port, server):
+            result = signing_load_test.run_load_test(host, port, "sign", connections, requests,
+                                                     keep_alive=keep_alive)
+            result["mean_batch_size"] = server.service.stats()["mean_batch_size"]
+        results[label] = result
+        print(f"{label:<20}{signing_load_test.format_result(result)}  "
+              f"平均批次 {result['mean_batch_size']:.2f}")
+    return results
+
+BENCHMARKS = {
+    "load": bench_key_loading,
+    "unlock": bench_unlock_cache,
+    "envelope": bench_envelope,
+    "oaep-stream": bench_oaep_stream,
+    "verify-cache": bench_verify_cache,
+    "x509": bench_x509_batch,
+    "merkle": bench_merkle,
+    "registry": bench_key_registry,
+    "validation": bench_key_validation,
+    "export": bench_key_export,
+    "durable": bench_durable_write,
+    "tree": bench_tree_manifest,
+    "keygen": bench_keygen,
+    "server": bench_signing_server,
+}
+
+def main():
+    """主函数 - 运行选定的基准"""
+    parser = argparse.ArgumentParser(description="RSA 工具性能基准")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"要运行的基准，可选: {', '.join(sorted(BENCHMARKS))} (默认全部)")
+    parser.add_argument("--key-size", type=int, default=2048, help="密钥长度")
+
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准: {', '.join(unknown)}")
+
+    print("RSA 工具性能基准")
+    print("="*60)
+
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        BENCHMARKS[name](key_size=args.key_size)
+
+if __name__ == "__main__":
+    main()
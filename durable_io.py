@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化文件写入
+密钥文件先写入同目录下的临时文件并 fsync，设置权限 (私钥 0600) 后原子重命名，
+最后 fsync 所在目录，保证崩溃后只会看到旧文件或完整的新文件；
+BatchWriter 将目录 fsync 推迟到批次结束时每个目录只做一次，用于批量生成密钥
+"""
+
+from contextlib import contextmanager
+import os
+import tempfile
+
+import profiler
+
+# 私钥等敏感文件仅所有者可读写；公钥、证书、JWKS 需要被其他进程读取
+PRIVATE_FILE_MODE = 0o600
+PUBLIC_FILE_MODE = 0o644
+
+def fsync_directory(directory):
+    """fsync 目录，使其中的创建/重命名操作持久化 (不支持目录 fsync 的平台上跳过)"""
+    flags = getattr(os, "O_DIRECTORY", None)
+    if flags is None:
+        return
+    fd = os.open(directory, os.O_RDONLY | flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_file_atomic(filename, data, mode=PRIVATE_FILE_MODE, fsync=True, sync_directory=True):
+    """
+    原子地写入文件: 临时文件 -> fsync -> chmod -> rename -> fsync 目录
+
+    Args:
+        filename (str): 目标文件名
+        data (bytes|str): 文件内容，str 按 UTF-8 编码
+        mode (int): 文件权限
+        fsync (bool): 是否 fsync 文件内容
+        sync_directory (bool): 是否立即 fsync 所在目录
+
+    Returns:
+        str: 目标文件所在目录
+    """
+    with profiler.phase("io"):
+        return _write_file_atomic(filename, data, mode, fsync, sync_directory)
+
+def _write_file_atomic(filename, data, mode, fsync, sync_directory):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(filename))
+
+    # mkstemp 以 0600 创建临时文件，内容写完之前不会被其他用户读到
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{os.path.basename(filename)}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if sync_directory and fsync:
+        fsync_directory(directory)
+    return directory
+
+class DurableWriter:
+    """逐个文件持久化写入 (每个文件各自 fsync 目录)"""
+
+    def __init__(self, fsync=True):
+        """
+        Args:
+            fsync (bool): 是否 fsync；关闭后仍保持临时文件 + 重命名的原子性
+        """
+        self.fsync = fsync
+
+    def write(self, filename, data, mode=PRIVATE_FILE_MODE):
+        """写入一个文件"""
+        write_file_atomic(filename, data, mode, fsync=self.fsync)
+
+class BatchWriter(DurableWriter):
+    """
+    批量持久化写入: 每个文件仍然 fsync 并原子重命名，目录 fsync 推迟到 commit()
+    (或 with 块结束) 时每个目录只做一次
+
+    注意: commit 之前发生崩溃时，已重命名的文件可能尚未持久化 (但不会出现半个文件)
+    """
+
+    def __init__(self, fsync=True):
+        super().__init__(fsync)
+        self._directories = set()
+        self.files = 0
+        self.directory_syncs = 0
+
+    def write(self, filename, data, mode=PRIVATE_FILE_MODE):
+        """写入一个文件，目录 fsync 推迟到 commit"""
+        self._directories.add(write_file_atomic(
+            filename, data, mode, fsync=self.fsync, sync_directory=False
+        ))
+        self.files += 1
+
+    def commit(self):
+        """fsync 本批次涉及的所有目录"""
+        directories, self._directories = self._directories, set()
+        if self.fsync:
+            with profiler.phase("io"):
+                for directory in sorted(directories):
+                    fsync_directory(directory)
+                    self.directory_syncs += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 出错时也同步已完成重命名的文件所在目录
+        self.commit()
+        return False
+
+# 未指定写入器时使用的默认写入器
+DEFAULT_WRITER = DurableWriter()
+
+@contextmanager
+def batch(writer=None):
+    """
+    为一组相关文件 (如私钥 + 公钥) 提供批量写入器，结束时每个目录只 fsync 一次；
+    writer 本身已是 BatchWriter 时直接复用，由外层批次统一提交
+    """
+    writer = writer or DEFAULT_WRITER
+    if isinstance(writer, BatchWriter):
+        yield writer
+        return
+    with BatchWriter(fsync=writer.fsync) as batch_writer:
+        yield batch_writer
@@ -5,99 +5,249 @@
 包含密钥生成、签名、验证、加密、解密等功能
 """
 
+import time
+
+# 供 --profile 统计模块导入耗时，必须位于其他导入之前
+_IMPORT_STARTED = time.perf_counter()
+
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.backends import default_backend
 import os
 import base64
 import json
 import argparse
+import threading
+import sys
+import contextlib
+from collections import namedtuple
 from datetime import datetime
+import functools
 import hashlib
 
+from key_utils import fingerprint_from_der, public_key_der, public_key_fingerprint
+from key_vault import DEFAULT_KDF_ROUNDS
+from durable_io import PRIVATE_FILE_MODE, PUBLIC_FILE_MODE
+import durable_io
+import envelope
+import jwks
+import key_export
+import keygen
+import key_bundle
+import key_rotation
+import key_validation
+import key_vault
+import merkle_sign
+import oaep_stream
+import profiler
+import tree_manifest
+
+_IMPORT_FINISHED = time.perf_counter()
+
+# 不可变的密钥状态快照: 私钥、公钥及公钥指纹总是作为一个整体被替换，
+# 每个操作只读取一次快照，因此并发重新加载时不会用到一半新一半旧的密钥
+KeyState = namedtuple("KeyState", ["private_key", "public_key", "fingerprint"])
+
 class EnhancedRSATool:
     """增强版 RSA 工具类"""
     
-    def __init__(self, key_size=2048):
+    def __init__(self, key_size=2048, unlock_cache=None, verify_cache=None, key_policy=None,
+                 writer=None, keygen_engine=None):
         self.key_size = key_size
-        self.private_key = None
-        self.public_key = None
+        self._keys = KeyState(None, None, None)
+        # 只串行化写入方；读取方直接读取 self._keys (单次属性读取是原子的)
+        self._keys_lock = threading.Lock()
+        # 可选的 key_vault.UnlockCache，多次加载同一私钥时只付一次解密开销
+        self.unlock_cache = unlock_cache
+        # 可选的 verify_cache.VerificationCache，重复验证同一签名时跳过 RSA 运算
+        self.verify_cache = verify_cache
+        # 可选的 key_validation.KeyPolicy，加载时在私钥一致性校验之前拒绝弱密钥
+        self.key_policy = key_policy
+        # 密钥文件写入器 (durable_io)；批量生成时传入 BatchWriter 以合并目录 fsync
+        self.writer = writer or durable_io.DEFAULT_WRITER
+        # 密钥生成引擎 (keygen)，记录每个密钥的生成耗时
+        self.keygen_engine = keygen_engine or keygen.DEFAULT_ENGINE
+    
+    @property
+    def key_state(self):
+        """当前密钥状态快照 (KeyState)，需要成对使用私钥和公钥时应只读取一次"""
+        return self._keys
+    
+    @property
+    def private_key(self):
+        return self._keys.private_key
+    
+    @private_key.setter
+    def private_key(self, private_key):
+        # 公钥与指纹由新私钥导出并一起替换，读取方不会看到新私钥配旧公钥
+        if private_key is None:
+            self._swap_keys(private_key=None)
+        else:
+            self.set_keys(private_key)
+    
+    @property
+    def public_key(self):
+        return self._keys.public_key
+    
+    @public_key.setter
+    def public_key(self, public_key):
+        # 只替换公钥 (用于只做验证的实例)；需要成对替换时使用 set_keys
+        self._swap_keys(public_key=public_key)
+    
+    def set_keys(self, private_key, public_key=None):
+        """
+        原子地替换密钥对 (public_key 省略时由私钥导出)
+        
+        Returns:
+            KeyState: 新的密钥状态快照
+        """
+        if public_key is None and private_key is not None:
+            public_key = private_key.public_key()
+        return self._swap_keys(private_key=private_key, public_key=public_key)
+    
+    def _swap_keys(self, **changes):
+        """以新快照整体替换密钥状态；指纹在锁外预先计算"""
+        if "public_key" in changes:
+            public_key = changes["public_key"]
+            changes["fingerprint"] = public_key_fingerprint(public_key) if public_key else None
+        with self._keys_lock:
+            self._keys = self._keys._replace(**changes)
+            return self._keys
+    
+    def _require_private_key(self):
+        private_key = self._keys.private_key
+        if not private_key:
+            raise ValueError("请先加载私钥")
+        return private_key
+    
+    def _require_public_key(self, public_key=None):
+        public_key = public_key or self._keys.public_key
+        if not public_key:
+            raise ValueError("请先加载公钥")
+        return public_key
     
+    @profiler.timed("keygen")
     def generate_key_pair(self, save_to_file=True):
         """生成 RSA 密钥对"""
         print(f"正在生成 {self.key_size} 位的 RSA 密钥对...")
         
-        self.private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=self.key_size,
-            backend=default_backend()
-        )
+        private_key = self.keygen_engine.generate(self.key_size)
         
-        self.public_key = self.private_key.public_key()
+        keys = self.set_keys(private_key)
         
+        # 保存刚生成的快照，而不是重新读取可能已被并发替换的当前密钥
         if save_to_file:
-            self.save_keys()
+            self._save_keys(keys)
         
         print("RSA 密钥对生成成功！")
-        return self.private_key, self.public_key
+        return keys.private_key, keys.public_key
+    
+    def save_keys(self, private_filename="private_key.pem", public_filename="public_key.pem",
+                  password=None, kdf_rounds=DEFAULT_KDF_ROUNDS):
+        """保存密钥到文件 (提供密码时私钥加密保存)"""
+        self._save_keys(self._keys, private_filename, public_filename, password, kdf_rounds)
     
-    def save_keys(self, private_filename="private_key.pem", public_filename="public_key.pem"):
-        """保存密钥到文件"""
+    @profiler.timed("crypto")
+    def _save_keys(self, keys, private_filename="private_key.pem", public_filename="public_key.pem",
+                   password=None, kdf_rounds=DEFAULT_KDF_ROUNDS):
+        """保存指定的密钥状态快照"""
         # 保存私钥
-        private_pem = self.private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        with open(private_filename, 'wb') as f:
-            f.write(private_pem)
+        private_pem = key_vault.private_key_to_pem(keys.private_key, password, kdf_rounds)
         
         # 保存公钥
-        public_pem = self.public_key.public_bytes(
+        public_pem = keys.public_key.public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
         
-        with open(public_filename, 'wb') as f:
-            f.write(public_pem)
+        # 临时文件 + fsync + 原子重命名，私钥权限 0600
+        with durable_io.batch(self.writer) as writer:
+            writer.write(private_filename, private_pem, PRIVATE_FILE_MODE)
+            writer.write(public_filename, public_pem, PUBLIC_FILE_MODE)
         
         print(f"私钥已保存到: {private_filename}")
         print(f"公钥已保存到: {public_filename}")
     
-    def load_keys(self, private_filename="private_key.pem", public_filename="public_key.pem"):
+    @profiler.timed("key_load")
+    def load_keys(self, private_filename="private_key.pem", public_filename="public_key.pem",
+                  password=None):
         """从文件加载密钥"""
+        loader = key_vault.load_pem_private_key_file
+        if self.key_policy is not None:
+            loader = functools.partial(
+                key_validation.load_pem_private_key_file, policy=self.key_policy
+            )
+        
         try:
             # 加载私钥
-            with open(private_filename, 'rb') as f:
-                private_data = f.read()
-                self.private_key = serialization.load_pem_private_key(
-                    private_data, password=None, backend=default_backend()
+            if self.unlock_cache is not None:
+                private_key = self.unlock_cache.get_or_load(
+                    private_filename, password, loader
                 )
+            else:
+                private_key = loader(private_filename, password)
             
             # 加载公钥
             with open(public_filename, 'rb') as f:
                 public_data = f.read()
-                self.public_key = serialization.load_pem_public_key(
+                public_key = serialization.load_pem_public_key(
                     public_data, backend=default_backend()
                 )
+            if self.key_policy is not None:
+                key_validation.ensure_key_policy(public_key, self.key_policy)
             
+            # 全部加载成功后才一次性替换，失败时保留原有密钥
+            self.set_keys(private_key, public_key)
+            
+            print("密钥加载成功！")
+            return True
+        except Exception as e:
+            print(f"加载密钥失败: {e}")
+            return False
+    
+    @profiler.timed("crypto")
+    def save_key_bundle(self, filename="key_bundle.rsab", password=None,
+                        kdf_rounds=DEFAULT_KDF_ROUNDS):
+        """保存密钥到单文件密钥包 (DER 格式，加载更快)"""
+        private_key = self._require_private_key()
+        
+        key_bundle.save_key_bundle(private_key, filename, password, kdf_rounds, self.writer)
+        print(f"密钥包已保存到: {filename}")
+    
+    @profiler.timed("key_load")
+    def load_key_bundle(self, filename="key_bundle.rsab", use_mmap=False, validate=True,
+                        password=None):
+        """从单文件密钥包加载密钥"""
+        def loader(bundle_filename, bundle_password):
+            return key_bundle.load_key_bundle(
+                bundle_filename, use_mmap=use_mmap, validate=validate,
+                password=bundle_password
+            )
+        
+        try:
+            if self.unlock_cache is not None:
+                result = self.unlock_cache.get_or_load(filename, password, loader)
+            else:
+                result = loader(filename, password)
+            if self.key_policy is not None:
+                key_validation.ensure_key_policy(result[1], self.key_policy)
+            self.set_keys(result[0], result[1])
             print("密钥加载成功！")
             return True
         except Exception as e:
             print(f"加载密钥失败: {e}")
             return False
     
+    @profiler.timed("crypto")
     def sign_message(self, message, signature_filename=None):
         """对消息进行数字签名"""
-        if not self.private_key:
-            raise ValueError("请先加载私钥")
+        private_key = self._require_private_key()
         
         # 计算消息的哈希值
         message_hash = hashlib.sha256(message.encode('utf-8')).digest()
         
         # 使用私钥签名
-        signature = self.private_key.sign(
+        signature = private_key.sign(
             message_hash,
             padding.PSS(
                 mgf=padding.MGF1(hashes.SHA256()),
@@ -108,24 +258,30 @@ class EnhancedRSATool:
         
         # 保存签名到文件
         if signature_filename:
-            with open(signature_filename, 'wb') as f:
-                f.write(signature)
+            self.writer.write(signature_filename, signature, PUBLIC_FILE_MODE)
             print(f"签名已保存到: {signature_filename}")
         
         return signature
     
+    @profiler.timed("crypto")
     def verify_signature(self, message, signature, public_key=None):
         """验证数字签名"""
-        if not public_key:
-            public_key = self.public_key
-        
-        if not public_key:
-            raise ValueError("请先加载公钥")
+        public_key = self._require_public_key(public_key)
         
         try:
             # 计算消息的哈希值
             message_hash = hashlib.sha256(message.encode('utf-8')).digest()
             
+            # 命中验证缓存时跳过 RSA 运算
+            cache_key = None
+            if self.verify_cache is not None:
+                cache_key = self.verify_cache.make_key(
+                    self.verify_cache.fingerprint_for(public_key), message_hash, signature
+                )
+                if self.verify_cache.lookup(cache_key):
+                    print("✅ 签名验证成功！")
+                    return True
+            
             # 验证签名
             public_key.verify(
                 signature,
@@ -137,19 +293,52 @@ class EnhancedRSATool:
                 hashes.SHA256()
             )
             
+            if cache_key is not None:
+                self.verify_cache.store(cache_key)
+            
             print("✅ 签名验证成功！")
             return True
         except Exception as e:
             print(f"❌ 签名验证失败: {e}")
             return False
     
+    @profiler.timed("crypto")
+    def sign_batch(self, records):
+        """Merkle 批量签名: 一次私钥运算签名整批记录的树根"""
+        self._require_private_key()
+        
+        return merkle_sign.sign_batch(self, records)
+    
+    @profiler.timed("crypto")
+    def verify_batch_record(self, record, proof, batch_signature, public_key=None):
+        """验证单条记录的 Merkle 包含证明 (树根验签结果可由 verify_cache 复用)"""
+        public_key = self._require_public_key(public_key)
+        
+        verifier = merkle_sign.MerkleVerifier(public_key, self.verify_cache)
+        return verifier.verify(record, proof, batch_signature)
+    
+    @profiler.timed("crypto")
+    def sign_tree(self, root, manifest_file=None, signature_file=None, max_workers=None,
+                  incremental=True):
+        """为目录树生成排序的摘要清单并只签名一次，未变化的文件复用上次的摘要"""
+        self._require_private_key()
+        
+        return tree_manifest.sign_tree(
+            self, root, manifest_file, signature_file, max_workers, incremental, self.writer
+        )
+    
+    @profiler.timed("crypto")
+    def verify_tree(self, root, manifest_file=None, signature_file=None, public_key=None,
+                    max_workers=None):
+        """验证目录树与签名清单一致 (并行计算文件摘要)"""
+        public_key = self._require_public_key(public_key)
+        
+        return tree_manifest.verify_tree(public_key, root, manifest_file, signature_file, max_workers)
+    
+    @profiler.timed("crypto")
     def encrypt_message(self, message, public_key=None):
         """使用公钥加密消息"""
-        if not public_key:
-            public_key = self.public_key
-        
-        if not public_key:
-            raise ValueError("请先加载公钥")
+        public_key = self._require_public_key(public_key)
         
         # 加密消息
         encrypted = public_key.encrypt(
@@ -163,13 +352,13 @@ class EnhancedRSATool:
         
         return encrypted
     
+    @profiler.timed("crypto")
     def decrypt_message(self, encrypted_message):
         """使用私钥解密消息"""
-        if not self.private_key:
-            raise ValueError("请先加载私钥")
+        private_key = self._require_private_key()
         
         # 解密消息
-        decrypted = self.private_key.decrypt(
+        decrypted = private_key.decrypt(
             encrypted_message,
             padding.OAEP(
                 mgf=padding.MGF1(algorithm=hashes.SHA256()),
@@ -180,95 +369,242 @@ class EnhancedRSATool:
         
         return decrypted.decode('utf-8')
     
-    def get_key_info(self):
-        """获取密钥信息"""
-        if not self.private_key:
+    @profiler.timed("crypto")
+    def encrypt_stream(self, src, dst, public_key=None, max_workers=None):
+        """分块 RSA-OAEP 加密任意长度的输入流"""
+        public_key = self._require_public_key(public_key)
+        
+        return oaep_stream.encrypt_stream(src, dst, public_key, max_workers=max_workers)
+    
+    @profiler.timed("crypto")
+    def decrypt_stream(self, src, dst, max_workers=None):
+        """解密分块 RSA-OAEP 密文流"""
+        private_key = self._require_private_key()
+        
+        return oaep_stream.decrypt_stream(src, dst, private_key, max_workers=max_workers)
+    
+    @profiler.timed("crypto")
+    def encrypt_for_recipients(self, message, public_keys=None, max_workers=None):
+        """为多个接收者生成数字信封 (正文只加密一次)"""
+        if not public_keys:
+            public_key = self._keys.public_key
+            public_keys = [public_key] if public_key else []
+        
+        if not public_keys:
+            raise ValueError("请先加载公钥")
+        
+        return envelope.encrypt_for_recipients(message, public_keys, max_workers=max_workers)
+    
+    @profiler.timed("crypto")
+    def decrypt_envelope(self, envelope_data):
+        """使用私钥解开数字信封"""
+        private_key = self._require_private_key()
+        
+        return envelope.decrypt_envelope(envelope_data, private_key).decode('utf-8')
+    
+    @profiler.timed("crypto")
+    def create_csr(self, common_name, dns_names=None, **attributes):
+        """生成 PEM 编码的证书签名请求"""
+        private_key = self._require_private_key()
+        # cryptography.x509 导入较慢，只在需要证书功能时加载
+        import x509_issuer
+        
+        csr = x509_issuer.create_csr(private_key, common_name, dns_names, **attributes)
+        return csr.public_bytes(serialization.Encoding.PEM)
+    
+    def create_local_ca(self, common_name, valid_days=3650, **attributes):
+        """以当前密钥创建自签名的本地 CA"""
+        private_key = self._require_private_key()
+        import x509_issuer
+        
+        return x509_issuer.LocalCA.create(private_key, common_name, valid_days, **attributes)
+    
+    def get_key_info(self, include_modulus=True):
+        """获取密钥信息 (公钥只序列化一次；include_modulus 为 False 时跳过十进制模数转换)"""
+        keys = self._keys
+        if not keys.private_key:
             return None
         
+        numbers = keys.public_key.public_numbers()
+        public_bytes = public_key_der(keys.public_key)
         info = {
-            "key_size": self.private_key.key_size,
-            "public_exponent": self.private_key.public_key().public_numbers().e,
-            "modulus": str(self.private_key.public_key().public_numbers().n),
-            "public_key_base64": self.get_public_key_base64(),
-            "fingerprint": self.get_key_fingerprint(),
-            "generated_time": datetime.now().isoformat()
+            "key_size": keys.private_key.key_size,
+            "public_exponent": numbers.e,
         }
+        if include_modulus:
+            info["modulus"] = str(numbers.n)
+        info.update({
+            "public_key_base64": base64.b64encode(public_bytes).decode('utf-8'),
+            "fingerprint": fingerprint_from_der(public_bytes),
+            "generated_time": datetime.now().isoformat()
+        })
         
         return info
     
     def get_public_key_base64(self):
         """获取 Base64 编码的公钥"""
-        public_bytes = self.public_key.public_bytes(
+        public_bytes = self._require_public_key().public_bytes(
             encoding=serialization.Encoding.DER,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
         return base64.b64encode(public_bytes).decode('utf-8')
     
     def get_key_fingerprint(self):
-        """获取密钥指纹"""
-        public_bytes = self.public_key.public_bytes(
-            encoding=serialization.Encoding.DER,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        return hashlib.sha256(public_bytes).hexdigest()
+        """获取密钥指纹 (随密钥状态快照一起计算)"""
+        return self._keys.fingerprint
+    
+    def export_public_key(self, stream, formats=("pem",)):
+        """
+        将公钥按所选格式 (pem/der/hex/b64/jwk) 流式写入文件或管道
+        
+        Returns:
+            int: 写入的字节数
+        """
+        public_key = self._require_public_key()
+        
+        return key_export.export_public_key(public_key, stream, formats)
+    
+    def get_jwk(self, use="sig", alg=None):
+        """获取公钥的 JWK 表示 (kid 为密钥指纹)"""
+        public_key = self._require_public_key()
+        
+        return jwks.public_key_to_jwk(public_key, use=use, alg=alg)
     
     def export_key_info(self, filename="key_info.json"):
         """导出密钥信息到 JSON 文件"""
         info = self.get_key_info()
         if info:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(info, f, indent=2, ensure_ascii=False)
+            content = json.dumps(info, indent=2, ensure_ascii=False)
+            self.writer.write(filename, content, PUBLIC_FILE_MODE)
             print(f"密钥信息已导出到: {filename}")
     
-    def create_key_backup(self, backup_dir="key_backup"):
-        """创建密钥备份"""
+    @profiler.timed("crypto")
+    def create_key_backup(self, backup_dir="key_backup", password=None,
+                          kdf_rounds=DEFAULT_KDF_ROUNDS):
+        """创建密钥备份 (提供密码时私钥加密保存)"""
         if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
+            os.makedirs(backup_dir, mode=0o700)
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        keys = self._keys
         
         # 备份私钥
         private_backup = os.path.join(backup_dir, f"private_key_{timestamp}.pem")
-        private_pem = self.private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        with open(private_backup, 'wb') as f:
-            f.write(private_pem)
+        private_pem = key_vault.private_key_to_pem(keys.private_key, password, kdf_rounds)
         
         # 备份公钥
         public_backup = os.path.join(backup_dir, f"public_key_{timestamp}.pem")
-        public_pem = self.public_key.public_bytes(
+        public_pem = keys.public_key.public_bytes(
             encoding=serialization.Encoding.PEM,
             format=serialization.PublicFormat.SubjectPublicKeyInfo
         )
-        with open(public_backup, 'wb') as f:
-            f.write(public_pem)
+        
+        with durable_io.batch(self.writer) as writer:
+            writer.write(private_backup, private_pem, PRIVATE_FILE_MODE)
+            writer.write(public_backup, public_pem, PUBLIC_FILE_MODE)
         
         print(f"密钥备份已创建: {backup_dir}")
 
 def main():
     """主函数 - 命令行界面"""
     parser = argparse.ArgumentParser(description="增强版 RSA 密钥管理工具")
-    parser.add_argument("--action", choices=["generate", "sign", "verify", "encrypt", "decrypt", "info"], 
+    parser.add_argument("--action", choices=["generate", "sign", "verify", "encrypt", "decrypt", "info",
+                                             "encrypt-file", "decrypt-file", "rotate", "csr", "jwks", "validate", "export",
+                                             "sign-tree", "verify-tree", "serve"], 
                        default="generate", help="执行的操作")
     parser.add_argument("--key-size", type=int, default=2048, help="密钥长度")
+    parser.add_argument("--keygen", choices=keygen.PRODUCTION_ENGINES, default="openssl",
+                       help="密钥生成引擎 (generate/rotate)")
     parser.add_argument("--message", help="要签名/验证/加密/解密的消息")
     parser.add_argument("--signature-file", help="签名文件路径")
-    parser.add_argument("--output", help="输出文件路径")
+    parser.add_argument("--input", help="输入文件路径 (encrypt-file/decrypt-file)，或目录 (sign-tree/verify-tree)")
+    parser.add_argument("--output", help="输出文件路径 (sign-tree/verify-tree 时为清单路径)")
+    parser.add_argument("--common-name", help="证书签名请求的通用名 (csr)")
+    parser.add_argument("--dns-name", action="append", help="证书签名请求的 DNS 名称，可重复 (csr)")
+    parser.add_argument("--key-file", action="append",
+                       help="要校验的公钥/私钥 PEM 文件，可重复 (validate，默认当前目录的公钥文件)")
+    parser.add_argument("--min-key-size", type=int, default=2048, help="校验策略的最小密钥长度 (validate)")
+    parser.add_argument("--format", action="append", choices=key_export.FORMATS,
+                       help="公钥导出格式，可重复 (export，默认 pem)")
+    parser.add_argument("--overlap", type=float, default=24 * 3600,
+                       help="轮换后旧公钥仍被接受的时间，秒 (rotate/jwks)")
+    parser.add_argument("--host", default="127.0.0.1", help="签名服务监听地址 (serve)")
+    parser.add_argument("--port", type=int, default=8080, help="签名服务端口 (serve)")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                       help="签名服务合并请求的等待时间，毫秒 (serve)")
+    parser.add_argument("--queue-size", type=int, default=1024,
+                       help="签名服务排队请求上限，超出时返回 503 (serve)")
+    parser.add_argument("--key-bundle", help="使用单文件密钥包 (生成时额外写出，其他操作从中加载)")
+    parser.add_argument("--password-env", help="保存私钥密码的环境变量名 (设置后私钥加密存储)")
+    parser.add_argument("--kdf-rounds", type=int, default=DEFAULT_KDF_ROUNDS,
+                       help="私钥加密的 PBKDF2 迭代轮数")
+    parser.add_argument("--profile", action="store_true",
+                       help="按阶段 (导入/密钥加载/密码运算/I/O) 统计耗时并写出 JSON 报告")
+    parser.add_argument("--profile-output", default="profile_report.json", help="剖析报告文件路径")
+    parser.add_argument("--profile-cprofile", action="store_true",
+                       help="剖析时同时运行 cProfile (原始统计写入 <报告路径>.prof)")
+    parser.add_argument("--profile-tracemalloc", action="store_true", help="剖析时跟踪内存分配")
     
     args = parser.parse_args()
     
-    rsa_tool = EnhancedRSATool(args.key_size)
+    if args.profile:
+        run_profiled(args)
+    else:
+        run_action(args)
+
+def run_profiled(args):
+    """以剖析模式执行命令，在标准错误输出阶段耗时摘要并写出 JSON 报告"""
+    cli_profiler = profiler.Profiler(
+        use_cprofile=args.profile_cprofile, use_tracemalloc=args.profile_tracemalloc
+    )
+    process_age = profiler.process_age()
+    if process_age is not None:
+        # 解释器启动到本模块开始导入之间的时间
+        cli_profiler.add("startup", max(0.0, process_age - (time.perf_counter() - _IMPORT_STARTED)))
+    cli_profiler.add("import", _IMPORT_FINISHED - _IMPORT_STARTED)
+    
+    with cli_profiler.start(started_at=_IMPORT_STARTED):
+        run_action(args)
+    
+    report = cli_profiler.report(action=args.action, key_size=args.key_size)
+    if args.profile_cprofile:
+        stats_file = args.profile_output + ".prof"
+        cli_profiler.dump_stats(stats_file)
+        report["cprofile"]["stats_file"] = stats_file
+    
+    durable_io.write_file_atomic(
+        args.profile_output, json.dumps(report, indent=2, ensure_ascii=False), PUBLIC_FILE_MODE
+    )
+    print(cli_profiler.format_summary(report), file=sys.stderr)
+    print(f"剖析报告已写入: {args.profile_output}", file=sys.stderr)
+
+def run_action(args):
+    """执行命令行指定的操作"""
+    password = None
+    if args.password_env:
+        password = os.environ.get(args.password_env)
+        if not password:
+            print(f"环境变量 {args.password_env} 未设置或为空")
+            return
+    
+    rsa_tool = EnhancedRSATool(args.key_size, keygen_engine=keygen.create_engine(args.keygen))
+    
+    def load_selected_keys():
+        """按命令行参数从 PEM 文件或密钥包加载密钥"""
+        if args.key_bundle:
+            return rsa_tool.load_key_bundle(args.key_bundle, password=password)
+        return rsa_tool.load_keys(password=password)
     
     if args.action == "generate":
-        rsa_tool.generate_key_pair()
+        rsa_tool.generate_key_pair(save_to_file=False)
+        rsa_tool.save_keys(password=password, kdf_rounds=args.kdf_rounds)
+        if args.key_bundle:
+            rsa_tool.save_key_bundle(args.key_bundle, password, args.kdf_rounds)
         rsa_tool.export_key_info()
-        rsa_tool.create_key_backup()
+        rsa_tool.create_key_backup(password=password, kdf_rounds=args.kdf_rounds)
         
-        # 显示密钥信息
-        info = rsa_tool.get_key_info()
+        # 显示密钥信息 (不显示模数，跳过十进制转换)
+        info = rsa_tool.get_key_info(include_modulus=False)
         print("\n" + "="*60)
         print("RSA 密钥信息")
         print("="*60)
@@ -284,7 +620,7 @@ def main():
             print("请提供要签名的消息")
             return
         
-        if not rsa_tool.load_keys():
+        if not load_selected_keys():
             return
         
         signature = rsa_tool.sign_message(args.message, args.signature_file)
@@ -295,7 +631,7 @@ def main():
             print("请提供消息和签名文件")
             return
         
-        if not rsa_tool.load_keys():
+        if not load_selected_keys():
             return
         
         with open(args.signature_file, 'rb') as f:
@@ -308,7 +644,7 @@ def main():
             print("请提供要加密的消息")
             return
         
-        if not rsa_tool.load_keys():
+        if not load_selected_keys():
             return
         
         encrypted = rsa_tool.encrypt_message(args.message)
@@ -326,7 +662,7 @@ def main():
             print("请提供要解密的消息 (Base64 格式)")
             return
         
-        if not rsa_tool.load_keys():
+        if not load_selected_keys():
             return
         
         try:
@@ -342,8 +678,161 @@ def main():
         except Exception as e:
             print(f"解密失败: {e}")
     
+    elif args.action in ("encrypt-file", "decrypt-file"):
+        if not args.input or not args.output:
+            print("请提供输入文件和输出文件")
+            return
+        
+        if not load_selected_keys():
+            return
+        
+        with open(args.input, 'rb') as src, open(args.output, 'wb') as dst:
+            if args.action == "encrypt-file":
+                stats = rsa_tool.encrypt_stream(src, dst)
+                print(f"已分块加密 {stats['bytes']} 字节 ({stats['blocks']} 块): {args.output}")
+            else:
+                stats = rsa_tool.decrypt_stream(src, dst)
+                print(f"已解密 {stats['bytes']} 字节 ({stats['blocks']} 块): {args.output}")
+    
+    elif args.action == "rotate":
+        if not load_selected_keys():
+            return
+        
+        # 以当前密钥为起点轮换，旧公钥以指纹命名保留，供重叠期内的验证方使用
+        rotator = key_rotation.KeyRotator(
+            key_size=args.key_size, policy=key_rotation.RotationPolicy(overlap=args.overlap),
+            key_dir=os.getcwd(), password=password,
+            kdf_rounds=args.kdf_rounds, initial_key=rsa_tool.private_key,
+            generator=rsa_tool.keygen_engine.generate
+        )
+        try:
+            old_fingerprint = rotator.current.fingerprint
+            rotator.rotate(wait=True)
+        finally:
+            rotator.stop()
+        
+        if args.key_bundle:
+            key_bundle.save_key_bundle(rotator.current.private_key, args.key_bundle,
+                                       password, args.kdf_rounds)
+        
+        print(f"旧密钥指纹: {old_fingerprint}")
+        print(f"旧公钥已保留到: public_key.{old_fingerprint[:16]}.pem")
+        print(f"新密钥指纹: {rotator.current.fingerprint}")
+    
+    elif args.action == "csr":
+        if not args.common_name:
+            print("请提供证书签名请求的通用名")
+            return
+        
+        if not load_selected_keys():
+            return
+        
+        csr_pem = rsa_tool.create_csr(args.common_name, args.dns_name)
+        if args.output:
+            with open(args.output, 'wb') as f:
+                f.write(csr_pem)
+            print(f"证书签名请求已保存到: {args.output}")
+        else:
+            print(csr_pem.decode('utf-8'))
+    
+    elif args.action == "jwks":
+        if not load_selected_keys():
+            return
+        
+        # 当前公钥加上轮换时保留、仍在重叠窗口内的旧公钥 (public_key.<指纹>.pem)
+        builder = jwks.JWKSBuilder()
+        builder.add_key(rsa_tool.public_key)
+        for name in key_rotation.retained_public_key_files(".", args.overlap):
+            with open(name, 'rb') as f:
+                builder.add_key(serialization.load_pem_public_key(f.read()))
+        
+        output = args.output or "jwks.json"
+        result = builder.write(output)
+        status = "已更新" if result["written"] else "未变化"
+        print(f"JWKS {status}: {output} ({len(builder)} 个密钥, ETag: {result['etag']})")
+    
+    elif args.action == "validate":
+        filenames = args.key_file or sorted(
+            name for name in os.listdir(".")
+            if name.startswith("public_key") and name.endswith(".pem")
+        )
+        if not filenames:
+            print("未找到要校验的密钥文件")
+            return
+        
+        policy = key_validation.KeyPolicy(min_key_size=args.min_key_size)
+        reports = key_validation.validate_key_files(filenames, policy)
+        rejected = 0
+        for report in reports:
+            if report.problems:
+                rejected += 1
+                print(f"✗ {report.label}: {'; '.join(report.problems)}")
+            else:
+                print(f"✓ {report.label}")
+        print(f"共校验 {len(reports)} 个密钥，{rejected} 个未通过")
+    
+    elif args.action == "export":
+        # 导出到标准输出时状态信息改写到标准错误，管道中只有密钥数据
+        with contextlib.redirect_stdout(sys.stdout if args.output else sys.stderr):
+            if not load_selected_keys():
+                return
+        
+        formats = args.format or ["pem"]
+        if args.output:
+            with open(args.output, 'wb') as f:
+                written = rsa_tool.export_public_key(f, formats)
+            print(f"公钥已导出到: {args.output} ({', '.join(formats)}, {written} 字节)")
+        else:
+            rsa_tool.export_public_key(sys.stdout.buffer, formats)
+            sys.stdout.buffer.flush()
+    
+    elif args.action in ("sign-tree", "verify-tree"):
+        if not args.input:
+            print("请使用 --input 指定目录")
+            return
+        if not load_selected_keys():
+            return
+        
+        if args.action == "sign-tree":
+            stats = rsa_tool.sign_tree(args.input, args.output, args.signature_file)
+            print(f"清单已签名: {stats['manifest']} ({stats['files']} 个文件，"
+                  f"重新计算 {stats['hashed']} 个，复用 {stats['reused']} 个)")
+            print(f"签名已保存到: {stats['signature']}")
+        else:
+            report = rsa_tool.verify_tree(args.input, args.output, args.signature_file)
+            if not report.signature_valid:
+                print("❌ 清单签名无效")
+            elif report.valid:
+                print("✅ 目录树验证成功！")
+            else:
+                for label, paths in (("已修改", report.modified), ("缺失", report.missing),
+                                     ("新增", report.added)):
+                    for path in paths:
+                        print(f"✗ {label}: {path}")
+                print("❌ 目录树与清单不一致")
+    
+    elif args.action == "serve":
+        if not load_selected_keys():
+            return
+        
+        # http.server 只在启动服务时才需要，避免拖慢其他命令的导入
+        import signing_server
+        
+        server = signing_server.make_server(
+            rsa_tool, args.host, args.port, batch_window=args.batch_window_ms / 1000,
+            queue_size=args.queue_size
+        )
+        host, port = server.server_address[:2]
+        print(f"签名服务已启动: http://{host}:{port} (按 Ctrl+C 停止)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("签名服务已停止")
+        finally:
+            server.server_close()
+    
     elif args.action == "info":
-        if not rsa_tool.load_keys():
+        if not load_selected_keys():
             return
         
         info = rsa_tool.get_key_info()
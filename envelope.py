@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多接收者数字信封
+消息正文只用随机数据密钥 (AES-256-GCM) 加密一次，数据密钥再用 RSA-OAEP
+分别包装给每个接收者；接收者通过公钥指纹在 O(1) 时间内找到自己的密钥槽
+
+信封布局 (大端序):
+    magic        6 字节  b"RSAENV"
+    version      1 字节  当前为 1
+    count        2 字节  接收者数量
+    每个接收者:
+        fingerprint 32 字节  接收者公钥 DER 的 SHA-256 摘要
+        wrapped_len  2 字节  包装后数据密钥长度
+        wrapped_key  wrapped_len 字节
+    nonce       12 字节  AES-GCM 随机数
+    ciphertext   剩余字节 (含 16 字节认证标签)
+
+头部 (ciphertext 之前的全部字节) 作为 AES-GCM 的附加认证数据，篡改接收者表会导致解密失败
+"""
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import hashlib
+import os
+import struct
+
+from key_utils import public_key_der
+
+ENVELOPE_MAGIC = b"RSAENV"
+ENVELOPE_VERSION = 1
+
+_PREFIX = struct.Struct(">6sBH")
+_SLOT = struct.Struct(">32sH")
+_NONCE_SIZE = 12
+
+# 接收者数量低于该值时串行包装，避免线程池开销
+_PARALLEL_THRESHOLD = 4
+
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+Envelope = namedtuple("Envelope", ["recipients", "nonce", "ciphertext", "header"])
+
+def _wrap_data_key(public_key, data_key):
+    """为单个接收者包装数据密钥，返回 (指纹摘要, 包装结果)"""
+    fingerprint = hashlib.sha256(public_key_der(public_key)).digest()
+    return fingerprint, public_key.encrypt(data_key, _OAEP)
+
+def encrypt_for_recipients(plaintext, public_keys, max_workers=None):
+    """
+    为多个接收者加密同一份消息
+
+    Args:
+        plaintext (bytes|str): 要加密的消息
+        public_keys (iterable): 接收者的 RSA 公钥对象
+        max_workers (int): 包装数据密钥的线程数，None 表示由线程池决定
+
+    Returns:
+        bytes: 序列化后的数字信封
+    """
+    if isinstance(plaintext, str):
+        plaintext = plaintext.encode('utf-8')
+
+    public_keys = list(public_keys)
+    if not public_keys:
+        raise ValueError("至少需要一个接收者公钥")
+    if len(public_keys) > 0xFFFF:
+        raise ValueError("接收者数量过多")
+
+    data_key = AESGCM.generate_key(bit_length=256)
+
+    if len(public_keys) < _PARALLEL_THRESHOLD or max_workers == 1:
+        slots = [_wrap_data_key(key, data_key) for key in public_keys]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            slots = list(executor.map(lambda key: _wrap_data_key(key, data_key), public_keys))
+
+    # 同一公钥重复出现时只保留一个槽位
+    unique_slots = dict(slots)
+
+    header_parts = [_PREFIX.pack(ENVELOPE_MAGIC, ENVELOPE_VERSION, len(unique_slots))]
+    for fingerprint, wrapped in unique_slots.items():
+        header_parts.append(_SLOT.pack(fingerprint, len(wrapped)))
+        header_parts.append(wrapped)
+    nonce = os.urandom(_NONCE_SIZE)
+    header_parts.append(nonce)
+    header = b"".join(header_parts)
+
+    ciphertext = AESGCM(data_key).encrypt(nonce, plaintext, header)
+    return header + ciphertext
+
+def parse_envelope(data):
+    """
+    解析数字信封
+
+    Args:
+        data (bytes): 序列化后的数字信封
+
+    Returns:
+        Envelope: recipients 为 {指纹摘要(bytes): 包装后的数据密钥} 字典
+    """
+    if len(data) < _PREFIX.size:
+        raise ValueError("数字信封数据过短")
+
+    magic, version, count = _PREFIX.unpack_from(data, 0)
+    if magic != ENVELOPE_MAGIC:
+        raise ValueError("不是有效的数字信封")
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"不支持的数字信封版本: {version}")
+
+    offset = _PREFIX.size
+    recipients = {}
+    for _ in range(count):
+        if len(data) < offset + _SLOT.size:
+            raise ValueError("数字信封被截断")
+        fingerprint, wrapped_len = _SLOT.unpack_from(data, offset)
+        offset += _SLOT.size
+        recipients[fingerprint] = bytes(data[offset:offset + wrapped_len])
+        offset += wrapped_len
+
+    if len(data) < offset + _NONCE_SIZE:
+        raise ValueError("数字信封被截断")
+    nonce = bytes(data[offset:offset + _NONCE_SIZE])
+    offset += _NONCE_SIZE
+
+    return Envelope(recipients, nonce, bytes(data[offset:]), bytes(data[:offset]))
+
+def list_recipients(data):
+    """
+    列出数字信封的接收者
+
+    Args:
+        data (bytes): 序列化后的数字信封
+
+    Returns:
+        list: 接收者公钥指纹 (十六进制)
+    """
+    return [fingerprint.hex() for fingerprint in parse_envelope(data).recipients]
+
+def decrypt_envelope(data, private_key):
+    """
+    使用接收者私钥解开数字信封
+
+    Args:
+        data (bytes): 序列化后的数字信封
+        private_key: 接收者的 RSA 私钥对象
+
+    Returns:
+        bytes: 解密后的消息
+    """
+    envelope = parse_envelope(data)
+    fingerprint = hashlib.sha256(public_key_der(private_key.public_key())).digest()
+
+    wrapped = envelope.recipients.get(fingerprint)
+    if wrapped is None:
+        raise ValueError("该私钥不是此数字信封的接收者")
+
+    data_key = private_key.decrypt(wrapped, _OAEP)
+    return AESGCM(data_key).decrypt(envelope.nonce, envelope.ciphertext, envelope.header)
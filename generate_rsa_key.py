@@ -6,17 +6,26 @@ RSA 密钥生成器
 """
 
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import padding
 import os
+import sys
 import base64
 
-def generate_rsa_key_pair(key_size=2048):
+from durable_io import PRIVATE_FILE_MODE, PUBLIC_FILE_MODE, write_file_atomic
+from key_utils import public_key_der
+import key_export
+import keygen
+
+# display_key_info 各编码的显示名称
+_FORMAT_LABELS = {"pem": "PEM", "hex": "十六进制", "b64": "Base64", "jwk": "JWK"}
+
+def generate_rsa_key_pair(key_size=2048, engine=None):
     """
     生成 RSA 密钥对
     
     Args:
         key_size (int): 密钥长度，默认 2048 位
+        engine (KeygenEngine): 密钥生成引擎，默认 keygen.DEFAULT_ENGINE
     
     Returns:
         tuple: (private_key, public_key)
@@ -24,11 +33,7 @@ def generate_rsa_key_pair(key_size=2048):
     print(f"正在生成 {key_size} 位的 RSA 密钥对...")
     
     # 生成私钥
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=key_size,
-        backend=default_backend()
-    )
+    private_key = (engine or keygen.DEFAULT_ENGINE).generate(key_size)
     
     # 获取公钥
     public_key = private_key.public_key()
@@ -51,9 +56,8 @@ def save_private_key(private_key, filename="private_key.pem"):
         encryption_algorithm=serialization.NoEncryption()
     )
     
-    # 保存到文件
-    with open(filename, 'wb') as f:
-        f.write(pem)
+    # 原子写入并 fsync，权限 0600
+    write_file_atomic(filename, pem, PRIVATE_FILE_MODE)
     
     print(f"私钥已保存到: {filename}")
 
@@ -71,9 +75,8 @@ def save_public_key(public_key, filename="public_key.pem"):
         format=serialization.PublicFormat.SubjectPublicKeyInfo
     )
     
-    # 保存到文件
-    with open(filename, 'wb') as f:
-        f.write(pem)
+    # 原子写入并 fsync
+    write_file_atomic(filename, pem, PUBLIC_FILE_MODE)
     
     print(f"公钥已保存到: {filename}")
 
@@ -96,37 +99,37 @@ def get_public_key_base64(public_key):
     # 转换为 Base64
     return base64.b64encode(public_bytes).decode('utf-8')
 
-def display_key_info(private_key, public_key):
+def display_key_info(private_key, public_key, formats=("b64", "hex"), stream=None):
     """
     显示密钥信息
     
     Args:
         private_key: RSA 私钥对象
         public_key: RSA 公钥对象
+        formats (tuple): 要显示的公钥编码 (pem/hex/b64/jwk)，未选择的编码不会计算
+        stream: 输出的文本流，默认为标准输出
     """
-    print("\n" + "="*50)
-    print("RSA 密钥信息")
-    print("="*50)
+    stream = stream or sys.stdout
+    unknown = [fmt for fmt in formats if fmt not in _FORMAT_LABELS]
+    if unknown:
+        raise ValueError(f"不支持的显示格式: {', '.join(unknown)}")
+    
+    print("\n" + "="*50, file=stream)
+    print("RSA 密钥信息", file=stream)
+    print("="*50, file=stream)
     
     # 获取密钥大小
     key_size = private_key.key_size
-    print(f"密钥长度: {key_size} 位")
-    
-    # 获取公钥的 Base64 编码
-    public_key_b64 = get_public_key_base64(public_key)
-    print(f"公钥 (Base64):")
-    print(public_key_b64)
+    print(f"密钥长度: {key_size} 位", file=stream)
     
-    # 获取公钥的十六进制表示
-    public_bytes = public_key.public_bytes(
-        encoding=serialization.Encoding.DER,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo
-    )
-    public_hex = public_bytes.hex()
-    print(f"\n公钥 (十六进制):")
-    print(public_hex)
+    # 公钥只序列化一次，各编码分块直接写入输出流
+    public_bytes = public_key_der(public_key)
+    for index, fmt in enumerate(formats):
+        prefix = "\n" if index else ""
+        print(f"{prefix}公钥 ({_FORMAT_LABELS[fmt]}):", file=stream)
+        key_export.export_public_key(public_key, stream, (fmt,), der=public_bytes)
     
-    print("="*50)
+    print("="*50, file=stream)
 
 def main():
     """主函数"""
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JWK / JWKS 导出
+将 RSA 公钥序列化为 JWK (base64url 编码的 n/e，kid 为公钥指纹)，并把多个公钥
+聚合为 JWKS 文档；只在密钥集合变化时重新生成，原子写出并附带内容哈希 (ETag)，
+便于静态文件服务器直接提供并支持条件请求
+"""
+
+import base64
+import hashlib
+import json
+import os
+
+from durable_io import PUBLIC_FILE_MODE
+from key_utils import public_key_fingerprint
+import durable_io
+
+def _b64url_uint(value):
+    """将无符号整数编码为无填充的 base64url 字符串"""
+    raw = value.to_bytes(max(1, (value.bit_length() + 7) // 8), 'big')
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode('ascii')
+
+def public_key_to_jwk(public_key, kid=None, use="sig", alg=None):
+    """
+    将 RSA 公钥转换为 JWK
+
+    Args:
+        public_key: RSA 公钥对象
+        kid (str): 密钥 ID，默认为公钥指纹
+        use (str): 用途 ("sig" 或 "enc")
+        alg (str): JWA 算法，默认省略；注意 sign_message 先对消息做 SHA-256 再以
+            PSS (最大盐长度) 签名，其签名不满足标准 PS256 验证，不要声明为 PS256
+
+    Returns:
+        dict: JWK
+    """
+    numbers = public_key.public_numbers()
+    jwk = {
+        "kty": "RSA",
+        "kid": kid or public_key_fingerprint(public_key),
+        "n": _b64url_uint(numbers.n),
+        "e": _b64url_uint(numbers.e),
+    }
+    if use:
+        jwk["use"] = use
+    if alg:
+        jwk["alg"] = alg
+    return jwk
+
+class JWKSBuilder:
+    """增量维护的 JWKS 文档"""
+
+    def __init__(self):
+        self._keys = {}
+        self._content = None
+        self._etag = None
+
+    def add_key(self, public_key, use="sig", alg=None, kid=None):
+        """
+        添加公钥，已存在的 kid 不会重复计算
+
+        Returns:
+            str: 密钥 ID
+        """
+        kid = kid or public_key_fingerprint(public_key)
+        if kid not in self._keys:
+            self._keys[kid] = public_key_to_jwk(public_key, kid, use, alg)
+            self._content = None
+        return kid
+
+    def remove_key(self, kid):
+        """移除公钥，返回是否存在"""
+        if self._keys.pop(kid, None) is None:
+            return False
+        self._content = None
+        return True
+
+    def sync(self, public_keys, use="sig", alg=None):
+        """
+        使密钥集合与给定公钥列表一致，只为新增的公钥生成 JWK
+
+        Returns:
+            bool: 密钥集合是否发生变化
+        """
+        wanted = {public_key_fingerprint(key): key for key in public_keys}
+        changed = False
+        for kid in list(self._keys):
+            if kid not in wanted:
+                changed |= self.remove_key(kid)
+        for kid, key in wanted.items():
+            if kid not in self._keys:
+                self.add_key(key, use, alg, kid)
+                changed = True
+        return changed
+
+    def __contains__(self, kid):
+        return kid in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def document(self):
+        """返回 JWKS 文档 (按 kid 排序，保证输出稳定)"""
+        return {"keys": [self._keys[kid] for kid in sorted(self._keys)]}
+
+    def _build(self):
+        if self._content is None:
+            self._content = json.dumps(
+                self.document(), separators=(",", ":"), sort_keys=True
+            ).encode('utf-8')
+            self._etag = hashlib.sha256(self._content).hexdigest()
+
+    def content(self):
+        """返回序列化后的 JWKS (bytes)，密钥集合未变化时复用上次结果"""
+        self._build()
+        return self._content
+
+    @property
+    def etag(self):
+        """JWKS 内容的 SHA-256 摘要，可作为 HTTP ETag"""
+        self._build()
+        return self._etag
+
+    def write(self, filename, writer=None):
+        """
+        原子写出 JWKS 文件及其内容哈希 (filename + ".sha256")；
+        内容未变化时不改写文件，保留修改时间，使静态服务器的条件请求继续命中
+
+        Args:
+            filename (str): JWKS 文件名
+            writer (durable_io.DurableWriter): 文件写入器，默认持久化写入
+
+        Returns:
+            dict: {"etag": 内容哈希, "written": 是否实际写入}
+        """
+        content = self.content()
+        etag = self.etag
+        hash_filename = filename + ".sha256"
+
+        try:
+            with open(hash_filename, 'r', encoding='utf-8') as f:
+                if f.read().strip() == etag and os.path.exists(filename):
+                    return {"etag": etag, "written": False}
+        except FileNotFoundError:
+            pass
+
+        with durable_io.batch(writer) as batch_writer:
+            batch_writer.write(filename, content, PUBLIC_FILE_MODE)
+            batch_writer.write(hash_filename, etag + "\n", PUBLIC_FILE_MODE)
+
+        return {"etag": etag, "written": True}
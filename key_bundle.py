@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSA 密钥包 (Key Bundle) 格式
+将 DER 私钥、DER 公钥与元数据头部打包为单个二进制文件，
+加载时只需一次读取 (或 mmap)，无需 PEM 解码和第二次打开文件
+
+文件布局 (大端序):
+    magic        8 字节  b"RSAKBNDL"
+    version      1 字节  当前为 1
+    flags        1 字节  标志位 (FLAG_ENCRYPTED: 私钥为 PKCS#8 加密格式)
+    key_size     2 字节  密钥长度 (位)
+    created      8 字节  创建时间 (Unix 时间戳，秒)
+    fingerprint 32 字节  公钥 DER 的 SHA-256 摘要
+    private_len  4 字节  私钥 DER 长度
+    public_len   4 字节  公钥 DER 长度
+    private_der  private_len 字节
+    public_der   public_len 字节
+"""
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.backends import default_backend
+from datetime import datetime
+import hashlib
+import mmap
+import struct
+import time
+
+from durable_io import PRIVATE_FILE_MODE, PUBLIC_FILE_MODE
+from key_utils import public_key_der
+import durable_io
+import key_vault
+
+BUNDLE_MAGIC = b"RSAKBNDL"
+BUNDLE_VERSION = 1
+BUNDLE_EXTENSION = ".rsab"
+
+FLAG_ENCRYPTED = 0x01
+
+_HEADER = struct.Struct(">8sBBHQ32sII")
+HEADER_SIZE = _HEADER.size
+
+def _pack_bundle(private_der, public_der, key_size, created=None, flags=0):
+    """组装密钥包字节"""
+    if created is None:
+        created = int(time.time())
+    header = _HEADER.pack(
+        BUNDLE_MAGIC,
+        BUNDLE_VERSION,
+        flags,
+        key_size,
+        created,
+        hashlib.sha256(public_der).digest(),
+        len(private_der),
+        len(public_der)
+    )
+    return header + private_der + public_der
+
+def _parse_header(data):
+    """解析并校验密钥包头部"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("密钥包文件过短")
+
+    magic, version, flags, key_size, created, digest, private_len, public_len = \
+        _HEADER.unpack_from(data, 0)
+
+    if magic != BUNDLE_MAGIC:
+        raise ValueError("不是有效的密钥包文件")
+    if version != BUNDLE_VERSION:
+        raise ValueError(f"不支持的密钥包版本: {version}")
+
+    return {
+        "version": version,
+        "flags": flags,
+        "key_size": key_size,
+        "created": created,
+        "created_time": datetime.fromtimestamp(created).isoformat(),
+        "fingerprint": digest.hex(),
+        "private_len": private_len,
+        "public_len": public_len,
+    }
+
+def _split_bundle(data):
+    """校验并拆分密钥包，返回 (header, private_der, public_der)"""
+    header = _parse_header(data)
+
+    private_start = HEADER_SIZE
+    public_start = private_start + header["private_len"]
+    end = public_start + header["public_len"]
+    if len(data) < end:
+        raise ValueError("密钥包文件被截断")
+
+    private_der = bytes(data[private_start:public_start])
+    public_der = bytes(data[public_start:end])
+
+    if hashlib.sha256(public_der).hexdigest() != header["fingerprint"]:
+        raise ValueError("密钥包指纹校验失败")
+
+    return header, private_der, public_der
+
+def save_key_bundle(private_key, filename, password=None,
+                    kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS, writer=None):
+    """
+    将私钥保存为密钥包文件
+
+    Args:
+        private_key: RSA 私钥对象
+        filename (str): 密钥包文件名
+        password (str|bytes): 保护私钥的密码，为 None 时不加密
+        kdf_rounds (int): PBKDF2 迭代轮数
+        writer (durable_io.DurableWriter): 文件写入器，默认逐个文件持久化写入
+
+    Returns:
+        dict: 密钥包头部信息
+    """
+    if password:
+        private_der = key_vault.encrypt_private_key_der(private_key, password, kdf_rounds)
+        flags = FLAG_ENCRYPTED
+    else:
+        private_der = private_key.private_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        flags = 0
+    public_der = public_key_der(private_key.public_key())
+
+    data = _pack_bundle(private_der, public_der, private_key.key_size, flags=flags)
+    (writer or durable_io.DEFAULT_WRITER).write(filename, data, PRIVATE_FILE_MODE)
+
+    return _parse_header(data)
+
+def read_bundle_header(filename):
+    """
+    只读取密钥包头部，不解析密钥
+
+    Args:
+        filename (str): 密钥包文件名
+
+    Returns:
+        dict: 密钥包头部信息
+    """
+    with open(filename, 'rb') as f:
+        return _parse_header(f.read(HEADER_SIZE))
+
+def load_key_bundle(filename, use_mmap=False, validate=True, password=None):
+    """
+    从密钥包文件加载密钥对
+
+    Args:
+        filename (str): 密钥包文件名
+        use_mmap (bool): 是否通过 mmap 读取文件
+        validate (bool): 是否执行 RSA 私钥一致性检查；该检查占加载耗时的绝大部分，
+            仅对来源可信的密钥包 (如本机生成并受权限保护的文件) 才应关闭
+        password (str|bytes): 加密密钥包的密码
+
+    Returns:
+        tuple: (private_key, public_key, header)
+    """
+    with open(filename, 'rb') as f:
+        if use_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header, private_der, public_der = _split_bundle(mm)
+        else:
+            header, private_der, public_der = _split_bundle(f.read())
+
+    if header["flags"] & FLAG_ENCRYPTED:
+        if not password:
+            raise ValueError("密钥包已加密，请提供密码")
+        password = key_vault.password_bytes(password)
+    else:
+        password = None
+
+    private_key = serialization.load_der_private_key(
+        private_der, password=password, backend=default_backend(),
+        unsafe_skip_rsa_key_validation=not validate
+    )
+    public_key = serialization.load_der_public_key(
+        public_der, backend=default_backend()
+    )
+    return private_key, public_key, header
+
+def pem_to_bundle(private_filename, public_filename, bundle_filename, password=None,
+                  kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS, writer=None):
+    """
+    将现有的 PEM 密钥文件转换为密钥包
+
+    Args:
+        private_filename (str): PEM 私钥文件
+        public_filename (str): PEM 公钥文件
+        bundle_filename (str): 输出的密钥包文件
+        password (str|bytes): 私钥密码，同时用于读取 PEM 和加密密钥包
+        kdf_rounds (int): PBKDF2 迭代轮数
+
+    Returns:
+        dict: 密钥包头部信息
+    """
+    private_key = key_vault.load_pem_private_key_file(private_filename, password)
+
+    with open(public_filename, 'rb') as f:
+        public_key = serialization.load_pem_public_key(
+            f.read(), backend=default_backend()
+        )
+
+    if public_key_der(public_key) != public_key_der(private_key.public_key()):
+        raise ValueError("公钥与私钥不匹配")
+
+    return save_key_bundle(private_key, bundle_filename, password, kdf_rounds, writer)
+
+def bundle_to_pem(bundle_filename, private_filename, public_filename, password=None,
+                  kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS, writer=None):
+    """
+    将密钥包转换回 PEM 密钥文件
+
+    Args:
+        bundle_filename (str): 密钥包文件
+        private_filename (str): 输出的 PEM 私钥文件
+        public_filename (str): 输出的 PEM 公钥文件
+        password (str|bytes): 私钥密码，同时用于读取密钥包和加密 PEM
+        kdf_rounds (int): PBKDF2 迭代轮数
+
+    Returns:
+        dict: 密钥包头部信息
+    """
+    private_key, public_key, header = load_key_bundle(bundle_filename, password=password)
+
+    with durable_io.batch(writer) as batch_writer:
+        batch_writer.write(
+            private_filename, key_vault.private_key_to_pem(private_key, password, kdf_rounds),
+            PRIVATE_FILE_MODE
+        )
+        batch_writer.write(public_filename, public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ), PUBLIC_FILE_MODE)
+
+    return header
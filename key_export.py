@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式公钥导出
+每个公钥只做一次 DER 序列化，再按所选格式 (PEM/DER/hex/Base64/JWK) 分块编码并
+逐块写入文件或管道，不在内存中拼接完整的大字符串；未选择的格式完全不计算
+"""
+
+import base64
+import io
+import json
+
+from key_utils import fingerprint_from_der, public_key_der
+import jwks
+
+FORMATS = ("pem", "der", "hex", "b64", "jwk")
+
+# 每次编码的输入字节数: 48 字节恰好对应一行 64 字符的 PEM，且为 3 的倍数，Base64 分块无填充
+_CHUNK_SIZE = 48 * 256
+_PEM_LINE_BYTES = 48
+
+def _check_formats(formats):
+    formats = tuple(formats)
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        raise ValueError(f"不支持的导出格式: {', '.join(unknown)} (可选: {', '.join(FORMATS)})")
+    if not formats:
+        raise ValueError("至少需要一种导出格式")
+    return formats
+
+def iter_encoded(der, fmt, public_key=None):
+    """
+    按格式分块产出 DER 公钥的编码 (bytes)，文本格式以换行结尾
+
+    Args:
+        der (bytes): DER (SubjectPublicKeyInfo) 编码的公钥
+        fmt (str): 导出格式，见 FORMATS
+        public_key: RSA 公钥对象，仅 jwk 格式需要 (kid 由 der 计算，不再重新序列化)
+    """
+    view = memoryview(der)
+    if fmt == "der":
+        yield bytes(view)
+    elif fmt == "hex":
+        for start in range(0, len(view), _CHUNK_SIZE):
+            yield view[start:start + _CHUNK_SIZE].hex().encode('ascii')
+        yield b"\n"
+    elif fmt == "b64":
+        for start in range(0, len(view), _CHUNK_SIZE):
+            yield base64.b64encode(view[start:start + _CHUNK_SIZE])
+        yield b"\n"
+    elif fmt == "pem":
+        yield b"-----BEGIN PUBLIC KEY-----\n"
+        for start in range(0, len(view), _CHUNK_SIZE):
+            chunk = view[start:start + _CHUNK_SIZE]
+            yield b"".join(
+                base64.b64encode(chunk[i:i + _PEM_LINE_BYTES]) + b"\n"
+                for i in range(0, len(chunk), _PEM_LINE_BYTES)
+            )
+        yield b"-----END PUBLIC KEY-----\n"
+    elif fmt == "jwk":
+        if public_key is None:
+            raise ValueError("jwk 格式需要公钥对象")
+        jwk = jwks.public_key_to_jwk(public_key, kid=fingerprint_from_der(der))
+        yield json.dumps(jwk, separators=(",", ":"), sort_keys=True).encode('utf-8') + b"\n"
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+def _writer(stream):
+    """返回向 stream 写入 bytes 的函数；文本流按 ASCII/UTF-8 解码后写入"""
+    if isinstance(stream, io.TextIOBase):
+        return lambda chunk: stream.write(chunk.decode('utf-8'))
+    return stream.write
+
+def export_public_key(public_key, stream, formats=("pem",), der=None):
+    """
+    将公钥按所选格式依次写入流
+
+    Args:
+        public_key: RSA 公钥对象
+        stream: 二进制或文本的文件对象/管道 (der 格式只能写入二进制流)
+        formats (iterable): 导出格式，见 FORMATS
+        der (bytes): 已有的 DER 编码，省略时序列化一次
+
+    Returns:
+        int: 写入的字节数
+    """
+    formats = _check_formats(formats)
+    if "der" in formats and isinstance(stream, io.TextIOBase):
+        raise ValueError("der 格式只能写入二进制流")
+
+    der = der if der is not None else public_key_der(public_key)
+    write = _writer(stream)
+    written = 0
+    for fmt in formats:
+        for chunk in iter_encoded(der, fmt, public_key):
+            write(chunk)
+            written += len(chunk)
+    return written
+
+def export_public_keys(public_keys, stream, formats=("pem",)):
+    """
+    批量导出公钥清单，逐个写入，不在内存中累积整个清单
+
+    Returns:
+        dict: {"keys": 公钥数量, "bytes": 写入字节数}
+    """
+    formats = _check_formats(formats)
+    count = 0
+    written = 0
+    for public_key in public_keys:
+        written += export_public_key(public_key, stream, formats)
+        count += 1
+    return {"keys": count, "bytes": written}
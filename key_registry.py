@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑公钥注册表
+面向需要同时持有数百万个公钥的验证端：所有公钥的 DER 字节连续存放在一个 bytearray 中，
+偏移和长度保存在 array 里，以原始 SHA-256 指纹为索引；
+cryptography 的公钥对象只在验证时按需创建，并放入一个小型 LRU 中复用
+
+每个公钥的常驻开销约为 DER 长度 + 指纹索引 (约 100 字节)，而不是一个完整的后端密钥对象
+"""
+
+from cryptography.hazmat.primitives import serialization
+from array import array
+from collections import OrderedDict
+import hashlib
+import sys
+import threading
+
+from key_utils import public_key_der, verify_text
+
+_FINGERPRINT_SIZE = 32
+
+def _raw_fingerprint(fingerprint):
+    """接受十六进制字符串或 32 字节原始指纹，返回原始指纹"""
+    if isinstance(fingerprint, str):
+        try:
+            fingerprint = bytes.fromhex(fingerprint)
+        except ValueError:
+            raise ValueError(f"无效的公钥指纹: {fingerprint}")
+    if len(fingerprint) != _FINGERPRINT_SIZE:
+        raise ValueError("公钥指纹必须为 32 字节 (64 个十六进制字符)")
+    return bytes(fingerprint)
+
+class PublicKeyRegistry:
+    """以指纹索引、DER 连续存储的只增公钥注册表 (线程安全)"""
+
+    __slots__ = ("cache_size", "_blob", "_offsets", "_lengths", "_index", "_objects",
+                 "_lock", "hits", "misses")
+
+    def __init__(self, cache_size=1024):
+        """
+        Args:
+            cache_size (int): LRU 中最多保留的公钥对象数
+        """
+        if cache_size < 1:
+            raise ValueError("缓存容量必须至少为 1")
+        self.cache_size = cache_size
+        self._blob = bytearray()
+        self._offsets = array('Q')
+        self._lengths = array('I')
+        self._index = {}
+        self._objects = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add_der(self, der):
+        """
+        添加 SubjectPublicKeyInfo DER 编码的公钥，重复的公钥只保存一份
+
+        Returns:
+            str: 公钥指纹 (十六进制)
+        """
+        fingerprint = hashlib.sha256(der).digest()
+        with self._lock:
+            if fingerprint not in self._index:
+                self._index[fingerprint] = len(self._offsets)
+                self._offsets.append(len(self._blob))
+                self._lengths.append(len(der))
+                self._blob += der
+        return fingerprint.hex()
+
+    def add(self, public_key):
+        """添加公钥对象，返回公钥指纹 (十六进制)"""
+        return self.add_der(public_key_der(public_key))
+
+    def add_pem(self, pem_data):
+        """添加 PEM 编码的公钥，返回公钥指纹 (十六进制)"""
+        if isinstance(pem_data, str):
+            pem_data = pem_data.encode('utf-8')
+        return self.add(serialization.load_pem_public_key(pem_data))
+
+    def extend(self, ders):
+        """批量添加 DER 编码的公钥，返回新增的数量"""
+        before = len(self)
+        for der in ders:
+            self.add_der(der)
+        return len(self) - before
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, fingerprint):
+        try:
+            return _raw_fingerprint(fingerprint) in self._index
+        except (TypeError, ValueError):
+            return False
+
+    def fingerprints(self):
+        """按添加顺序产出所有公钥指纹 (十六进制)"""
+        for fingerprint in list(self._index):
+            yield fingerprint.hex()
+
+    def get_der(self, fingerprint):
+        """
+        获取公钥的 DER 编码
+
+        Raises:
+            KeyError: 指纹未注册
+        """
+        raw = _raw_fingerprint(fingerprint)
+        with self._lock:
+            slot = self._index.get(raw)
+            if slot is None:
+                raise KeyError(raw.hex())
+            offset = self._offsets[slot]
+            return bytes(self._blob[offset:offset + self._lengths[slot]])
+
+    def get(self, fingerprint):
+        """
+        获取公钥对象，只在首次使用时从 DER 解析，并缓存在 LRU 中
+
+        Raises:
+            KeyError: 指纹未注册
+        """
+        raw = _raw_fingerprint(fingerprint)
+        with self._lock:
+            public_key = self._objects.get(raw)
+            if public_key is not None:
+                self._objects.move_to_end(raw)
+                self.hits += 1
+                return public_key
+            self.misses += 1
+
+        public_key = serialization.load_der_public_key(self.get_der(raw))
+        with self._lock:
+            self._objects[raw] = public_key
+            self._objects.move_to_end(raw)
+            while len(self._objects) > self.cache_size:
+                self._objects.popitem(last=False)
+        return public_key
+
+    def verify(self, fingerprint, message, signature):
+        """
+        使用注册表中的公钥验证 sign_message 生成的签名
+
+        Returns:
+            bool: 签名是否有效；指纹未注册时返回 False
+        """
+        try:
+            public_key = self.get(fingerprint)
+        except (KeyError, ValueError):
+            return False
+        return verify_text(public_key, message, signature)
+
+    def memory_usage(self):
+        """估算注册表常驻内存 (字节)，不含 LRU 中的公钥对象"""
+        count = len(self)
+        with self._lock:
+            storage = (
+                sys.getsizeof(self._blob)
+                + self._offsets.buffer_info()[1] * self._offsets.itemsize
+                + self._lengths.buffer_info()[1] * self._lengths.itemsize
+            )
+            index = sys.getsizeof(self._index)
+        # 索引键为 32 字节的 bytes 对象，值为槽位 int (小整数由解释器共享，这里按上限估算)
+        index += count * (sys.getsizeof(b"\0" * _FINGERPRINT_SIZE) + sys.getsizeof(2 ** 30))
+        return storage + index
+
+    def stats(self):
+        """返回注册表统计信息"""
+        count = len(self)
+        memory = self.memory_usage()
+        total = self.hits + self.misses
+        return {
+            "keys": count,
+            "der_bytes": len(self._blob),
+            "memory_bytes": memory,
+            "bytes_per_key": memory / count if count else 0.0,
+            "cached_objects": len(self._objects),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
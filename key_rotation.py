@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密钥轮换调度
+按策略 (最长使用时间、最多操作次数) 轮换签名密钥：到期前在后台预先生成继任密钥，
+到期时以一次引用替换完成原子切换，签名路径从不等待密钥生成；
+切换后的重叠窗口内，验证同时接受新旧密钥
+"""
+
+from cryptography.hazmat.primitives import serialization
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import itertools
+import os
+import threading
+import time
+
+from durable_io import PRIVATE_FILE_MODE, PUBLIC_FILE_MODE
+from key_utils import public_key_fingerprint, sign_text, verify_text
+import durable_io
+import key_vault
+import keygen
+
+# 一个密钥版本: operations 为该版本独立的签名计数器
+KeyVersion = namedtuple(
+    "KeyVersion",
+    ["version", "private_key", "public_key", "fingerprint", "created_at", "operations"]
+)
+
+# 已退役的密钥版本及其退役时间
+RetiredKey = namedtuple("RetiredKey", ["key", "retired_at"])
+
+class _OperationCounter:
+    """线程安全的签名次数计数器"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def increment(self):
+        with self._lock:
+            self._value += 1
+            return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+class RotationPolicy:
+    """密钥轮换策略"""
+
+    def __init__(self, max_age=30 * 24 * 3600, max_operations=None, overlap=24 * 3600,
+                 prewarm_ratio=0.8):
+        """
+        Args:
+            max_age (float): 密钥最长使用时间 (秒)，None 表示不按时间轮换
+            max_operations (int): 密钥最多签名次数，None 表示不按次数轮换
+            overlap (float): 轮换后旧密钥仍可用于验证的时间 (秒)
+            prewarm_ratio (float): 达到上限的该比例时开始后台生成继任密钥
+        """
+        if not 0 < prewarm_ratio <= 1:
+            raise ValueError("prewarm_ratio 必须在 (0, 1] 区间内")
+        self.max_age = max_age
+        self.max_operations = max_operations
+        self.overlap = overlap
+        self.prewarm_ratio = prewarm_ratio
+
+    def _reached(self, key, operations, now, ratio):
+        if self.max_age is not None and now - key.created_at >= self.max_age * ratio:
+            return True
+        if self.max_operations is not None and operations >= self.max_operations * ratio:
+            return True
+        return False
+
+    def rotation_due(self, key, operations, now):
+        """判断密钥是否已到轮换时间"""
+        return self._reached(key, operations, now, 1.0)
+
+    def prewarm_due(self, key, operations, now):
+        """判断是否应开始预生成继任密钥"""
+        return self._reached(key, operations, now, self.prewarm_ratio)
+
+class KeyRotator:
+    """带重叠窗口和预生成继任密钥的签名密钥轮换器 (线程安全)"""
+
+    def __init__(self, key_size=2048, policy=None, key_dir=None, password=None,
+                 kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS, initial_key=None,
+                 clock=time.time, generator=None):
+        """
+        Args:
+            key_size (int): 新密钥长度
+            policy (RotationPolicy): 轮换策略
+            key_dir (str): 轮换时写出密钥文件的目录，None 表示只在内存中轮换
+            password (str|bytes): 写出私钥时使用的密码
+            kdf_rounds (int): 加密私钥时的 PBKDF2 迭代轮数
+            initial_key: 初始私钥，None 时立即生成
+            clock (callable): 时钟，便于测试注入
+            generator (callable): generator(key_size) 返回新私钥，便于替换生成策略
+        """
+        self.key_size = key_size
+        self.policy = policy or RotationPolicy()
+        self.key_dir = key_dir
+        self.password = password
+        self.kdf_rounds = kdf_rounds
+        self._clock = clock
+        self._generator = generator or keygen.DEFAULT_ENGINE.generate
+        self._versions = itertools.count(1)
+        # _rotate_lock 只保护继任密钥/轮换任务/当前密钥引用的短暂更新，签名路径以非阻塞方式获取；
+        # _rotation_lock 串行化整个轮换 (含私钥加密与 fsync)，签名路径从不获取
+        self._rotate_lock = threading.Lock()
+        self._rotation_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._successor = None
+        self._pending_rotation = None
+        self._scheduler = None
+        self._stop_event = threading.Event()
+
+        private_key = initial_key or self._generator(key_size)
+        self._current = self._new_version(private_key)
+        self._retired = ()
+        self.rotations = 0
+
+    def _new_version(self, private_key):
+        public_key = private_key.public_key()
+        return KeyVersion(
+            version=next(self._versions),
+            private_key=private_key,
+            public_key=public_key,
+            fingerprint=public_key_fingerprint(public_key),
+            created_at=self._clock(),
+            operations=_OperationCounter()
+        )
+
+    @property
+    def current(self):
+        """当前签名密钥版本"""
+        return self._current
+
+    def sign(self, message):
+        """
+        使用当前密钥签名，必要时触发 (非阻塞) 轮换
+
+        Args:
+            message (str): 要签名的消息
+
+        Returns:
+            tuple: (密钥指纹, 签名)
+        """
+        key = self._current
+        operations = key.operations.increment()
+        signature = sign_text(key.private_key, message)
+        self._check_policy(key, operations)
+        return key.fingerprint, signature
+
+    def verify(self, message, signature, key_id=None):
+        """
+        验证签名，重叠窗口内同时接受已退役的密钥
+
+        Args:
+            message (str): 原始消息
+            signature (bytes): 签名
+            key_id (str): 签名时返回的密钥指纹，提供时直接选择对应密钥
+
+        Returns:
+            bool: 签名是否有效
+        """
+        for key in self.verification_keys():
+            if key_id is not None and key.fingerprint != key_id:
+                continue
+            if verify_text(key.public_key, message, signature):
+                return True
+        return False
+
+    def verification_keys(self):
+        """返回当前可用于验证的密钥 (当前密钥在前)"""
+        now = self._clock()
+        keys = [self._current]
+        keys.extend(r.key for r in self._retired if now - r.retired_at < self.policy.overlap)
+        return keys
+
+    def _check_policy(self, key, operations):
+        """在签名路径上检查策略，只做非阻塞动作 (提交后台任务)"""
+        now = self._clock()
+        rotation_due = self.policy.rotation_due(key, operations, now)
+        if not rotation_due and not self.policy.prewarm_due(key, operations, now):
+            return
+        # 其他线程正在更新轮换状态时直接跳过，下一次签名或 tick 会再次检查
+        if not self._rotate_lock.acquire(blocking=False):
+            return
+        try:
+            if rotation_due:
+                self._schedule_rotation_locked(key)
+            else:
+                self._ensure_successor_locked()
+        finally:
+            self._rotate_lock.release()
+
+    def _ensure_successor(self):
+        """确保后台正在 (或已经) 生成继任密钥"""
+        with self._rotate_lock:
+            return self._ensure_successor_locked()
+
+    def _ensure_successor_locked(self):
+        if self._successor is None:
+            self._successor = self._executor.submit(self._generator, self.key_size)
+        return self._successor
+
+    def _schedule_rotation_locked(self, key):
+        """在后台线程中完成轮换 (含写文件)，同一时间最多排队一个轮换任务"""
+        if self._pending_rotation is None and self._current is key:
+            self._ensure_successor_locked()
+            # 单线程执行器按提交顺序运行，轮换任务执行时继任密钥已生成完毕
+            self._pending_rotation = self._executor.submit(self._run_scheduled_rotation, key)
+        return self._pending_rotation
+
+    def _run_scheduled_rotation(self, key):
+        try:
+            if self._current is key:
+                self.rotate(wait=False)
+        finally:
+            with self._rotate_lock:
+                self._pending_rotation = None
+
+    def rotate(self, wait=True):
+        """
+        切换到继任密钥
+
+        Args:
+            wait (bool): 继任密钥尚未生成完毕时是否等待；为 False 时直接返回 False
+
+        Returns:
+            bool: 是否完成了轮换
+        """
+        successor = self._ensure_successor()
+        if not wait and not successor.done():
+            return False
+        try:
+            private_key = successor.result()
+        except Exception:
+            # 生成失败的继任密钥不能留在原处，否则之后的每次轮换都会重复失败
+            with self._rotate_lock:
+                if self._successor is successor:
+                    self._successor = None
+            raise
+
+        with self._rotation_lock:
+            if self._successor is not successor:
+                # 其他线程已经用这个继任密钥完成了轮换
+                return True
+            previous = self._current
+            new_key = self._new_version(private_key)
+            # 私钥加密 (PBKDF2) 与 fsync 在 _rotate_lock 之外进行，签名路径不会被阻塞
+            if self.key_dir:
+                self._persist(previous, new_key)
+
+            with self._rotate_lock:
+                now = self._clock()
+                retired = [r for r in self._retired if now - r.retired_at < self.policy.overlap]
+                retired.insert(0, RetiredKey(previous, now))
+                # 先发布退役列表再替换当前密钥，保证任何时刻旧密钥都可被验证
+                self._retired = tuple(retired)
+                self._current = new_key
+                self._successor = None
+                self.rotations += 1
+        return True
+
+    def _persist(self, previous, key):
+        """持久化地写出新的密钥文件 (整组只 fsync 一次目录)，并保留旧公钥供重叠窗口内的验证方使用"""
+        os.makedirs(self.key_dir, exist_ok=True)
+        files = [
+            (f"public_key.{previous.fingerprint[:16]}.pem", previous.public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            ), PUBLIC_FILE_MODE),
+            ("private_key.pem", key_vault.private_key_to_pem(
+                key.private_key, self.password, self.kdf_rounds
+            ), PRIVATE_FILE_MODE),
+            ("public_key.pem", key.public_key.public_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PublicFormat.SubjectPublicKeyInfo
+            ), PUBLIC_FILE_MODE),
+        ]
+        with durable_io.batch() as writer:
+            for name, data, mode in files:
+                writer.write(os.path.join(self.key_dir, name), data, mode)
+
+    def flush(self, timeout=None):
+        """等待已提交的继任密钥生成与轮换任务全部完成"""
+        self._executor.submit(lambda: None).result(timeout)
+
+    def tick(self):
+        """按时间策略检查一次 (供调度线程或外部定时器调用)"""
+        key = self._current
+        self._check_policy(key, key.operations.value)
+
+    def start(self, interval=60):
+        """启动后台调度线程，定期检查时间策略"""
+        if self._scheduler is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                self.tick()
+
+        self._scheduler = threading.Thread(target=run, name="key-rotation", daemon=True)
+        self._scheduler.start()
+
+    def stop(self):
+        """停止后台调度线程和继任密钥生成线程"""
+        self._stop_event.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+            self._scheduler = None
+        self._executor.shutdown(wait=True)
+
+    def status(self):
+        """返回轮换状态信息"""
+        key = self._current
+        now = self._clock()
+        successor = self._successor
+        return {
+            "version": key.version,
+            "fingerprint": key.fingerprint,
+            "age": now - key.created_at,
+            "operations": key.operations.value,
+            "rotation_pending": self._pending_rotation is not None,
+            "successor_ready": successor is not None and successor.done(),
+            "verification_keys": [k.fingerprint for k in self.verification_keys()],
+            "rotations": self.rotations,
+        }
+
+def retained_public_key_files(key_dir, overlap, now=None):
+    """
+    轮换时保留的旧公钥文件 (public_key.<指纹>.pem) 中仍在重叠窗口内的文件；
+    文件在退役时写出，以修改时间作为退役时间
+
+    Args:
+        key_dir (str): 密钥目录
+        overlap (float): 重叠窗口 (秒)，见 RotationPolicy.overlap
+        now (float): 当前时间 (time.time 值)，默认为现在
+
+    Returns:
+        list: 按文件名排序的路径
+    """
+    now = time.time() if now is None else now
+    files = []
+    for name in sorted(os.listdir(key_dir)):
+        if not name.startswith("public_key.") or not name.endswith(".pem") or name == "public_key.pem":
+            continue
+        path = os.path.join(key_dir, name)
+        if now - os.stat(path).st_mtime < overlap:
+            files.append(path)
+    return files
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSA 密钥通用辅助函数
+供增强版工具及各扩展模块共享的序列化、指纹计算与签名
+"""
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.exceptions import InvalidSignature
+import hashlib
+import math
+
+def public_key_der(public_key):
+    """
+    获取公钥的 DER (SubjectPublicKeyInfo) 编码
+
+    Args:
+        public_key: RSA 公钥对象
+
+    Returns:
+        bytes: DER 编码的公钥
+    """
+    return public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def fingerprint_from_der(public_der):
+    """
+    根据 DER 编码的公钥计算指纹
+
+    Args:
+        public_der (bytes): DER 编码的公钥
+
+    Returns:
+        str: SHA-256 十六进制指纹
+    """
+    return hashlib.sha256(public_der).hexdigest()
+
+def public_key_fingerprint(public_key):
+    """
+    获取公钥指纹 (与 EnhancedRSATool.get_key_fingerprint 一致)
+
+    Args:
+        public_key: RSA 公钥对象
+
+    Returns:
+        str: SHA-256 十六进制指纹
+    """
+    return fingerprint_from_der(public_key_der(public_key))
+
+def pss_padding():
+    """EnhancedRSATool 签名使用的 PSS 填充 (MGF1-SHA256, 最大盐长度)"""
+    return padding.PSS(
+        mgf=padding.MGF1(hashes.SHA256()),
+        salt_length=padding.PSS.MAX_LENGTH
+    )
+
+def sign_bytes(private_key, data):
+    """
+    按 EnhancedRSATool.sign_message 的方式签名字节串 (先 SHA-256 再 PSS 签名)；
+    data 为消息的 UTF-8 编码时与 sign_text 的结果可互相验证
+
+    Args:
+        private_key: RSA 私钥对象
+        data (bytes): 要签名的数据
+
+    Returns:
+        bytes: 签名
+    """
+    return private_key.sign(hashlib.sha256(data).digest(), pss_padding(), hashes.SHA256())
+
+def verify_bytes(public_key, data, signature):
+    """
+    验证 sign_bytes/sign_text 生成的签名，不输出信息
+
+    Returns:
+        bool: 签名是否有效
+    """
+    try:
+        public_key.verify(signature, hashlib.sha256(data).digest(), pss_padding(), hashes.SHA256())
+        return True
+    except InvalidSignature:
+        return False
+
+def sign_text(private_key, message):
+    """
+    按 EnhancedRSATool.sign_message 的方式签名文本 (先 SHA-256 再 PSS 签名)
+
+    Args:
+        private_key: RSA 私钥对象
+        message (str): 要签名的消息
+
+    Returns:
+        bytes: 签名
+    """
+    return sign_bytes(private_key, message.encode('utf-8'))
+
+def verify_text(public_key, message, signature):
+    """
+    按 EnhancedRSATool.verify_signature 的方式验证签名，不输出信息
+
+    Returns:
+        bool: 签名是否有效
+    """
+    return verify_bytes(public_key, message.encode('utf-8'), signature)
+
+def small_primes(limit):
+    """
+    埃拉托斯特尼筛法求小素数 (用于小素因子检查与候选素数预筛)
+
+    Args:
+        limit (int): 上界 (不含)
+
+    Returns:
+        list: 小于 limit 的全部素数
+    """
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytearray(len(sieve[i * i::i]))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
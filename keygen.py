@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSA 密钥生成引擎
+把"如何生成私钥"抽象为可替换的引擎，并记录每个密钥的生成耗时与尝试次数:
+
+    openssl  cryptography/OpenSSL 默认实现 (最快，后端不公开候选素数的尝试次数)
+    python   在 Python 中搜索素数，可统计候选数、Miller-Rabin 测试次数等，用于观察生成代价；
+             非常量时间实现，仅供基准测试与诊断，不用于生产密钥
+    PooledKeygen  后台预先生成密钥，调用方几乎不必等待 (适合批量签发、密钥轮换)
+
+所有引擎都使用操作系统的 CSPRNG；生成的都是标准双素数 RSA 私钥
+(cryptography 不支持多素数 RSA 私钥，加载时会被拒绝)
+"""
+
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.backends import default_backend
+from collections import namedtuple
+import math
+import queue
+import secrets
+import statistics
+import threading
+import time
+
+from key_utils import small_primes
+
+# 单个密钥的生成记录: attempts 为候选素数数量，后端不公开时为 None
+KeygenRecord = namedtuple("KeygenRecord", ["engine", "key_size", "seconds", "attempts"])
+
+class KeygenStats:
+    """密钥生成统计 (线程安全，只保留最近 max_records 条记录)"""
+
+    def __init__(self, max_records=10000):
+        self.max_records = max_records
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, engine, key_size, seconds, attempts=None):
+        """记录一次密钥生成"""
+        with self._lock:
+            self._records.append(KeygenRecord(engine, key_size, seconds, attempts))
+            if len(self._records) > self.max_records:
+                del self._records[:len(self._records) - self.max_records]
+
+    def records(self):
+        """返回全部记录的副本"""
+        with self._lock:
+            return list(self._records)
+
+    def summary(self):
+        """
+        按 (引擎, 密钥长度) 汇总
+
+        Returns:
+            dict: {"<引擎>/<密钥长度>": {count, mean_seconds, p50_seconds, max_seconds,
+                   mean_attempts}}
+        """
+        groups = {}
+        for record in self.records():
+            groups.setdefault(f"{record.engine}/{record.key_size}", []).append(record)
+
+        summary = {}
+        for name, records in groups.items():
+            seconds = [record.seconds for record in records]
+            attempts = [record.attempts for record in records if record.attempts is not None]
+            summary[name] = {
+                "count": len(records),
+                "mean_seconds": statistics.fmean(seconds),
+                "p50_seconds": statistics.median(seconds),
+                "max_seconds": max(seconds),
+                "mean_attempts": statistics.fmean(attempts) if attempts else None,
+            }
+        return summary
+
+class KeygenEngine:
+    """密钥生成引擎基类，子类实现 _generate"""
+
+    name = None
+
+    def __init__(self, stats=None):
+        """
+        Args:
+            stats (KeygenStats): 统计对象，可在多个引擎之间共享
+        """
+        self.stats = stats or KeygenStats()
+
+    def generate(self, key_size=2048, public_exponent=65537):
+        """
+        生成 RSA 私钥并记录耗时 (签名与 KeyRotator 的 generator(key_size) 兼容)
+
+        Returns:
+            RSAPrivateKey: 私钥对象
+        """
+        started = time.perf_counter()
+        private_key, attempts = self._generate(key_size, public_exponent)
+        self.stats.record(self.name, key_size, time.perf_counter() - started, attempts)
+        return private_key
+
+    def _generate(self, key_size, public_exponent):
+        """返回 (私钥, 尝试次数)"""
+        raise NotImplementedError
+
+class OpenSSLKeygen(KeygenEngine):
+    """cryptography (OpenSSL) 默认的密钥生成"""
+
+    name = "openssl"
+
+    def _generate(self, key_size, public_exponent):
+        private_key = rsa.generate_private_key(
+            public_exponent=public_exponent,
+            key_size=key_size,
+            backend=default_backend()
+        )
+        return private_key, None
+
+# 2000 以内素数之积，一次 GCD 即可筛掉大部分合数候选
+_SIEVE_PRIMORIAL = math.prod(small_primes(2000))
+
+def _miller_rabin_rounds(bits):
+    """FIPS 186-4 表 C.3 中错误概率不超过 2^-100 所需的 Miller-Rabin 轮数"""
+    if bits >= 1536:
+        return 4
+    if bits >= 1024:
+        return 5
+    if bits >= 512:
+        return 7
+    return 40
+
+def _is_probable_prime(n, rounds):
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for _ in range(rounds):
+        a = secrets.randbelow(n - 3) + 2
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+class PythonKeygen(KeygenEngine):
+    """
+    在 Python 中搜索素数的密钥生成 (FIPS 186-4 B.3.3 风格)，比 OpenSSL 慢，
+    但可以统计候选数量和 Miller-Rabin 测试次数
+
+    注意: 大整数运算不是常量时间的，仅用于基准测试与诊断，不要用它生成生产密钥
+    """
+
+    name = "python"
+
+    def __init__(self, stats=None):
+        super().__init__(stats)
+        self.candidates = 0
+        self.primality_tests = 0
+        self._counter_lock = threading.Lock()
+
+    def _random_prime(self, bits, public_exponent):
+        """返回 (素数, 候选数量)"""
+        rounds = _miller_rabin_rounds(bits)
+        attempts = 0
+        tests = 0
+        while True:
+            attempts += 1
+            # 最高两位置 1 保证两个素数之积恰好为目标长度
+            candidate = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+            if math.gcd(candidate, _SIEVE_PRIMORIAL) != 1:
+                continue
+            if math.gcd(candidate - 1, public_exponent) != 1:
+                continue
+            tests += 1
+            if _is_probable_prime(candidate, rounds):
+                break
+        with self._counter_lock:
+            self.candidates += attempts
+            self.primality_tests += tests
+        return candidate, attempts
+
+    def _generate(self, key_size, public_exponent):
+        if key_size < 1024:
+            raise ValueError("密钥长度至少为 1024 位")
+        if public_exponent < 3 or public_exponent % 2 == 0:
+            raise ValueError("公钥指数必须为大于 2 的奇数")
+
+        attempts = 0
+        while True:
+            p, p_attempts = self._random_prime((key_size + 1) // 2, public_exponent)
+            q, q_attempts = self._random_prime(key_size // 2, public_exponent)
+            attempts += p_attempts + q_attempts
+            # 两个素数相差过近时模数可被 Fermat 方法分解
+            if abs(p - q).bit_length() <= key_size // 2 - 100:
+                continue
+            # 等价于 math.lcm (Python 3.9+)，兼容 3.8
+            lcm = (p - 1) * (q - 1) // math.gcd(p - 1, q - 1)
+            d = pow(public_exponent, -1, lcm)
+            if d.bit_length() > key_size // 2:
+                break
+
+        if p < q:
+            p, q = q, p
+        public_numbers = rsa.RSAPublicNumbers(public_exponent, p * q)
+        private_numbers = rsa.RSAPrivateNumbers(
+            p, q, d,
+            rsa.rsa_crt_dmp1(d, p), rsa.rsa_crt_dmq1(d, q), rsa.rsa_crt_iqmp(p, q),
+            public_numbers
+        )
+        return private_numbers.private_key(), attempts
+
+class PooledKeygen(KeygenEngine):
+    """
+    后台线程预先生成固定长度的密钥放入有界队列，generate 直接取出；
+    队列为空或长度不匹配时同步生成
+
+    注意: 预生成的私钥在使用前就驻留在内存中，不要在 fork 之前创建
+    """
+
+    name = "pooled"
+
+    def __init__(self, engine=None, key_size=2048, size=4, public_exponent=65537, stats=None):
+        """
+        Args:
+            engine (KeygenEngine): 实际生成密钥的引擎，默认 OpenSSLKeygen
+            key_size (int): 预生成的密钥长度
+            size (int): 池容量
+            public_exponent (int): 预生成密钥的公钥指数
+            stats (KeygenStats): 调用方看到的等待时间统计
+        """
+        if size < 1:
+            raise ValueError("池容量必须至少为 1")
+        super().__init__(stats)
+        self.engine = engine or OpenSSLKeygen()
+        self.key_size = key_size
+        self.public_exponent = public_exponent
+        self.hits = 0
+        self.misses = 0
+        self._pool = queue.Queue(maxsize=size)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._fill, name="keygen-pool", daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        while not self._closed.is_set():
+            private_key = self.engine.generate(self.key_size, self.public_exponent)
+            while not self._closed.is_set():
+                try:
+                    self._pool.put(private_key, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def available(self):
+        """池中已就绪的密钥数量"""
+        return self._pool.qsize()
+
+    def _generate(self, key_size, public_exponent):
+        if key_size == self.key_size and public_exponent == self.public_exponent:
+            try:
+                private_key = self._pool.get_nowait()
+                self.hits += 1
+                return private_key, None
+            except queue.Empty:
+                pass
+        self.misses += 1
+        return self.engine.generate(key_size, public_exponent), None
+
+    def close(self):
+        """停止后台生成并丢弃池中的密钥"""
+        self._closed.set()
+        self._thread.join()
+        while True:
+            try:
+                self._pool.get_nowait()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+ENGINES = {
+    "openssl": OpenSSLKeygen,
+    "python": PythonKeygen,
+}
+
+# 可用于生成生产密钥的引擎 (命令行只提供这些)
+PRODUCTION_ENGINES = ("openssl",)
+
+def create_engine(name, stats=None):
+    """按名称创建引擎 (见 ENGINES)"""
+    try:
+        return ENGINES[name](stats)
+    except KeyError:
+        raise ValueError(f"不支持的密钥生成引擎: {name} (可选: {', '.join(ENGINES)})")
+
+# 未指定引擎时使用的默认引擎
+DEFAULT_ENGINE = OpenSSLKeygen()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Merkle 批量签名
+对 N 条记录的摘要构建 Merkle 树，只用一次 RSA 私钥运算 (sign_message) 签名树根，
+每条记录附带紧凑的包含证明；验证单条记录只需 O(log N) 次哈希加一次可缓存的树根验签
+
+哈希规则 (与 RFC 6962 相同的域分离):
+    叶子 = SHA256(0x00 || SHA256(记录))
+    节点 = SHA256(0x01 || 左 || 右)
+    层内节点数为奇数时，最后一个节点直接提升到上一层
+
+批次签名布局 (大端序):  version 1 字节 | count 4 字节 | root 32 字节 | 签名
+记录证明布局 (大端序):  version 1 字节 | index 4 字节 | count 4 字节 | 路径长度 1 字节 | 路径哈希 32 字节 * n
+"""
+
+import hashlib
+import struct
+
+from key_utils import verify_text
+
+MERKLE_VERSION = 1
+
+_BATCH_HEADER = struct.Struct(">BI32s")
+_PROOF_HEADER = struct.Struct(">BIIB")
+_HASH_SIZE = 32
+
+def _leaf_hash(record):
+    if isinstance(record, str):
+        record = record.encode('utf-8')
+    return hashlib.sha256(b"\x00" + hashlib.sha256(record).digest()).digest()
+
+def _node_hash(left, right):
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+def root_message(root, count):
+    """树根对应的签名消息 (同时绑定记录数量)"""
+    return f"merkle-root:v{MERKLE_VERSION}:{count}:{root.hex()}"
+
+class MerkleTree:
+    """保存全部层级的 Merkle 树"""
+
+    def __init__(self, records):
+        """
+        Args:
+            records (iterable): 记录 (bytes 或 str)
+        """
+        level = [_leaf_hash(record) for record in records]
+        if not level:
+            raise ValueError("至少需要一条记录")
+        if len(level) > 0xFFFFFFFF:
+            raise ValueError("记录数量过多")
+
+        self.levels = [level]
+        while len(level) > 1:
+            next_level = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                next_level.append(level[-1])
+            self.levels.append(next_level)
+            level = next_level
+
+    @property
+    def count(self):
+        return len(self.levels[0])
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def path(self, index):
+        """返回第 index 条记录的兄弟节点哈希列表 (自底向上)"""
+        if not 0 <= index < self.count:
+            raise IndexError("记录序号超出范围")
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append(level[sibling])
+            index //= 2
+        return path
+
+class SignedBatch:
+    """一次签名的记录批次"""
+
+    def __init__(self, tree, signature):
+        self.tree = tree
+        self.signature = signature
+
+    @property
+    def root(self):
+        return self.tree.root
+
+    @property
+    def count(self):
+        return self.tree.count
+
+    def batch_signature(self):
+        """序列化的批次签名 (树根 + RSA 签名)，每批只需保存一次"""
+        return _BATCH_HEADER.pack(MERKLE_VERSION, self.count, self.root) + self.signature
+
+    def proof(self, index):
+        """序列化的第 index 条记录的包含证明"""
+        path = self.tree.path(index)
+        return _PROOF_HEADER.pack(MERKLE_VERSION, index, self.count, len(path)) + b"".join(path)
+
+    def proofs(self):
+        """按顺序产出所有记录的包含证明"""
+        for index in range(self.count):
+            yield self.proof(index)
+
+def sign_batch(rsa_tool, records):
+    """
+    对一批记录构建 Merkle 树并签名树根
+
+    Args:
+        rsa_tool (EnhancedRSATool): 已加载私钥的工具实例
+        records (iterable): 记录 (bytes 或 str)
+
+    Returns:
+        SignedBatch: 签名后的批次
+    """
+    tree = MerkleTree(records)
+    signature = rsa_tool.sign_message(root_message(tree.root, tree.count))
+    return SignedBatch(tree, signature)
+
+def parse_batch_signature(data):
+    """解析批次签名，返回 (count, root, signature)"""
+    if len(data) <= _BATCH_HEADER.size:
+        raise ValueError("批次签名数据过短")
+    version, count, root = _BATCH_HEADER.unpack_from(data, 0)
+    if version != MERKLE_VERSION:
+        raise ValueError(f"不支持的批次签名版本: {version}")
+    return count, root, bytes(data[_BATCH_HEADER.size:])
+
+def parse_proof(data):
+    """解析记录证明，返回 (index, count, path)"""
+    if len(data) < _PROOF_HEADER.size:
+        raise ValueError("包含证明数据过短")
+    version, index, count, path_len = _PROOF_HEADER.unpack_from(data, 0)
+    if version != MERKLE_VERSION:
+        raise ValueError(f"不支持的包含证明版本: {version}")
+    body = data[_PROOF_HEADER.size:]
+    if len(body) != path_len * _HASH_SIZE:
+        raise ValueError("包含证明长度不正确")
+    path = [bytes(body[i:i + _HASH_SIZE]) for i in range(0, len(body), _HASH_SIZE)]
+    return index, count, path
+
+def compute_root(record, index, count, path):
+    """
+    根据记录和包含证明重新计算树根
+
+    Returns:
+        bytes: 树根，证明结构与 (index, count) 不一致时返回 None
+    """
+    if not 0 <= index < count:
+        return None
+    node = _leaf_hash(record)
+    remaining = list(path)
+    while count > 1:
+        if index % 2 == 1:
+            if not remaining:
+                return None
+            node = _node_hash(remaining.pop(0), node)
+        elif index + 1 < count:
+            if not remaining:
+                return None
+            node = _node_hash(node, remaining.pop(0))
+        index //= 2
+        count = (count + 1) // 2
+    if remaining:
+        return None
+    return node
+
+class MerkleVerifier:
+    """验证单条记录的包含证明，树根验签结果通过 VerificationCache 复用"""
+
+    def __init__(self, public_key, cache=None):
+        """
+        Args:
+            public_key: 签名方的 RSA 公钥对象
+            cache (VerificationCache): 可选的验证缓存；同一批次的树根只做一次 RSA 验签
+        """
+        self.public_key = public_key
+        self.cache = cache
+
+    def verify_root(self, root, count, signature):
+        """验证批次树根签名"""
+        message = root_message(root, count)
+        if self.cache is None:
+            return verify_text(self.public_key, message, signature)
+
+        key = self.cache.make_key(
+            self.cache.fingerprint_for(self.public_key),
+            hashlib.sha256(message.encode('utf-8')).digest(),
+            signature
+        )
+        if self.cache.lookup(key):
+            return True
+        if verify_text(self.public_key, message, signature):
+            self.cache.store(key)
+            return True
+        return False
+
+    def verify(self, record, proof, batch_signature):
+        """
+        验证一条记录属于已签名的批次
+
+        Args:
+            record (bytes|str): 记录
+            proof (bytes): 记录的包含证明
+            batch_signature (bytes): 批次签名
+
+        Returns:
+            bool: 记录是否有效
+        """
+        try:
+            count, root, signature = parse_batch_signature(batch_signature)
+            index, proof_count, path = parse_proof(proof)
+        except ValueError:
+            return False
+
+        if proof_count != count or compute_root(record, index, count, path) != root:
+            return False
+        return self.verify_root(root, count, signature)
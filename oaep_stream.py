@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块 RSA-OAEP 流式加解密
+面向只接受纯 RSA-OAEP 密文的旧系统：按密钥长度和哈希算法把输入切分为
+最大尺寸的 OAEP 块，多线程并行加解密并输出带帧的流
+
+流布局 (大端序):
+    magic        6 字节  b"RSASTR"
+    version      1 字节  当前为 1
+    hash_id      1 字节  OAEP 哈希算法编号
+    block_size   2 字节  每个密文块的字节数 (等于模数字节数)
+    数据帧:  0x01 + block_size 字节密文
+    结束帧:  0x00 + 8 字节块数量 + 8 字节明文总长度
+
+每个密文块都是独立的标准 RSA-OAEP 密文 (label 为空)，可以被旧系统逐块解密；
+结束帧用于发现截断，但分块模式本身不防止块的重排，需要完整性时应配合签名使用
+"""
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import struct
+
+STREAM_MAGIC = b"RSASTR"
+STREAM_VERSION = 1
+
+_HEADER = struct.Struct(">6sBBH")
+_TRAILER = struct.Struct(">QQ")
+_FRAME_DATA = b"\x01"
+_FRAME_END = b"\x00"
+
+# 每个工作线程一次处理的块数，决定单批读取的数据量
+_BLOCKS_PER_WORKER = 16
+
+HASH_ALGORITHMS = {
+    1: hashes.SHA1,
+    2: hashes.SHA256,
+    3: hashes.SHA384,
+    4: hashes.SHA512,
+}
+_HASH_IDS = {cls.name: hash_id for hash_id, cls in HASH_ALGORITHMS.items()}
+
+def _oaep(hash_algorithm):
+    return padding.OAEP(
+        mgf=padding.MGF1(algorithm=hash_algorithm),
+        algorithm=hash_algorithm,
+        label=None
+    )
+
+def max_chunk_size(key_size, hash_algorithm=None):
+    """
+    计算单个 OAEP 块可容纳的最大明文长度
+
+    Args:
+        key_size (int): 密钥长度 (位)
+        hash_algorithm: OAEP 使用的哈希算法，默认 SHA-256
+
+    Returns:
+        int: 最大明文字节数 (k - 2*hLen - 2)
+    """
+    hash_algorithm = hash_algorithm or hashes.SHA256()
+    size = (key_size + 7) // 8 - 2 * hash_algorithm.digest_size - 2
+    if size <= 0:
+        raise ValueError("密钥长度不足以使用该哈希算法进行 OAEP 加密")
+    return size
+
+def _make_executor(max_workers):
+    """创建线程池并返回 (executor, 每批块数)；max_workers 为 1 时不创建线程池"""
+    if max_workers == 1:
+        return None, _BLOCKS_PER_WORKER
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    return ThreadPoolExecutor(max_workers=workers), workers * _BLOCKS_PER_WORKER
+
+def _run_batch(executor, func, items):
+    """在线程池中按顺序处理一批数据，块数很少时直接串行"""
+    if executor is None or len(items) == 1:
+        return [func(item) for item in items]
+    return list(executor.map(func, items))
+
+def encrypt_stream(src, dst, public_key, hash_algorithm=None, max_workers=None):
+    """
+    分块加密输入流
+
+    Args:
+        src: 可读的二进制文件对象
+        dst: 可写的二进制文件对象
+        public_key: RSA 公钥对象
+        hash_algorithm: OAEP 哈希算法，默认 SHA-256
+        max_workers (int): 线程数，为 1 时不使用线程池
+
+    Returns:
+        dict: 统计信息 (块数、明文字节数)
+    """
+    hash_algorithm = hash_algorithm or hashes.SHA256()
+    if hash_algorithm.name not in _HASH_IDS:
+        raise ValueError(f"不支持的 OAEP 哈希算法: {hash_algorithm.name}")
+
+    chunk_size = max_chunk_size(public_key.key_size, hash_algorithm)
+    block_size = (public_key.key_size + 7) // 8
+    oaep = _oaep(hash_algorithm)
+
+    dst.write(_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, _HASH_IDS[hash_algorithm.name], block_size))
+
+    def encrypt_chunk(chunk):
+        return public_key.encrypt(chunk, oaep)
+
+    executor, batch_blocks = _make_executor(max_workers)
+    blocks = 0
+    total = 0
+    try:
+        while True:
+            data = src.read(chunk_size * batch_blocks)
+            if not data:
+                break
+            chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+            for block in _run_batch(executor, encrypt_chunk, chunks):
+                dst.write(_FRAME_DATA)
+                dst.write(block)
+            blocks += len(chunks)
+            total += len(data)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    dst.write(_FRAME_END)
+    dst.write(_TRAILER.pack(blocks, total))
+    return {"blocks": blocks, "bytes": total, "chunk_size": chunk_size}
+
+def _read_exact(src, size):
+    """读取恰好 size 字节 (兼容管道的短读)"""
+    data = src.read(size)
+    while len(data) < size:
+        more = src.read(size - len(data))
+        if not more:
+            raise ValueError("分块密文流被截断")
+        data += more
+    return data
+
+def decrypt_stream(src, dst, private_key, max_workers=None):
+    """
+    解密分块密文流
+
+    Args:
+        src: 可读的二进制文件对象
+        dst: 可写的二进制文件对象
+        private_key: RSA 私钥对象
+        max_workers (int): 线程数，为 1 时不使用线程池
+
+    Returns:
+        dict: 统计信息 (块数、明文字节数)
+    """
+    magic, version, hash_id, block_size = _HEADER.unpack(_read_exact(src, _HEADER.size))
+    if magic != STREAM_MAGIC:
+        raise ValueError("不是有效的分块密文流")
+    if version != STREAM_VERSION:
+        raise ValueError(f"不支持的分块密文流版本: {version}")
+    if hash_id not in HASH_ALGORITHMS:
+        raise ValueError(f"未知的 OAEP 哈希算法编号: {hash_id}")
+    if block_size != (private_key.key_size + 7) // 8:
+        raise ValueError("密文块长度与私钥长度不匹配")
+
+    oaep = _oaep(HASH_ALGORITHMS[hash_id]())
+
+    def decrypt_block(block):
+        return private_key.decrypt(block, oaep)
+
+    executor, batch_blocks = _make_executor(max_workers)
+    blocks = 0
+    total = 0
+    finished = False
+    try:
+        while not finished:
+            batch = []
+            while len(batch) < batch_blocks:
+                frame_type = _read_exact(src, 1)
+                if frame_type == _FRAME_END:
+                    finished = True
+                    break
+                if frame_type != _FRAME_DATA:
+                    raise ValueError("分块密文流帧类型无效")
+                batch.append(_read_exact(src, block_size))
+
+            for chunk in _run_batch(executor, decrypt_block, batch):
+                dst.write(chunk)
+                total += len(chunk)
+            blocks += len(batch)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    expected_blocks, expected_total = _TRAILER.unpack(_read_exact(src, _TRAILER.size))
+    if expected_blocks != blocks or expected_total != total:
+        raise ValueError("分块密文流长度校验失败")
+    return {"blocks": blocks, "bytes": total}
+
+def encrypt_bytes(data, public_key, hash_algorithm=None, max_workers=None):
+    """分块加密内存中的数据，返回完整的密文流"""
+    dst = io.BytesIO()
+    encrypt_stream(io.BytesIO(data), dst, public_key, hash_algorithm, max_workers)
+    return dst.getvalue()
+
+def decrypt_bytes(data, private_key, max_workers=None):
+    """解密内存中的完整密文流"""
+    dst = io.BytesIO()
+    decrypt_stream(io.BytesIO(data), dst, private_key, max_workers)
+    return dst.getvalue()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行性能剖析
+按阶段 (导入、密钥加载、密钥生成、密码运算、文件 I/O、其他) 统计墙钟时间，
+可选附带 cProfile 热点函数和 tracemalloc 内存分配统计，并输出机器可读的 JSON 报告
+
+未启用剖析时 phase() 返回一个共享的空上下文，插桩点的开销可以忽略；
+cProfile、tracemalloc 等模块只在启用剖析时才导入
+"""
+
+from contextlib import nullcontext
+import functools
+import io
+import os
+import threading
+import time
+
+PHASES = ("startup", "import", "key_load", "keygen", "crypto", "io", "other")
+
+_NULL_PHASE = nullcontext()
+_active = None
+
+def phase(name):
+    """
+    记录一个阶段的上下文管理器；嵌套阶段的时间只计入最内层阶段
+
+    Args:
+        name (str): 阶段名称，见 PHASES
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL_PHASE
+    return profiler.phase(name)
+
+def timed(name):
+    """将整个函数调用计入指定阶段的装饰器 (未启用剖析时直接调用原函数)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def process_age():
+    """当前进程已运行的墙钟时间 (秒)，仅 Linux 可用，其他平台返回 None"""
+    try:
+        with open("/proc/self/stat", 'r') as f:
+            # 进程名可能包含空格，从最后一个右括号之后开始按字段切分
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", 'r') as f:
+            uptime = float(f.read().split()[0])
+        ticks = os.sysconf("SC_CLK_TCK")
+        return max(0.0, uptime - int(fields[19]) / ticks)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class _PhaseContext:
+    """单次阶段计时，子阶段的时间从父阶段中扣除"""
+
+    __slots__ = ("profiler", "name", "start", "children")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.profiler.add(self.name, elapsed - self.children)
+        return False
+
+class Profiler:
+    """分阶段计时器，可选 cProfile 与 tracemalloc"""
+
+    def __init__(self, use_cprofile=False, use_tracemalloc=False, top=20):
+        """
+        Args:
+            use_cprofile (bool): 是否同时运行 cProfile
+            use_tracemalloc (bool): 是否跟踪内存分配
+            top (int): 报告中保留的热点函数/分配位置数量
+        """
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.top = top
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cprofile = None
+        self._started = None
+        self._stopped = None
+        self._tracemalloc_report = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def phase(self, name):
+        """返回指定阶段的计时上下文"""
+        return _PhaseContext(self, name)
+
+    def add(self, name, seconds, calls=1):
+        """累加一个阶段的耗时 (也可用于记录剖析开始之前测得的时间，如模块导入)"""
+        with self._lock:
+            entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += seconds
+            entry["calls"] += calls
+
+    def start(self, started_at=None):
+        """
+        开始剖析并设为当前活动的剖析器
+
+        Args:
+            started_at (float): 总时间的起点 (time.perf_counter 值)，默认为现在
+        """
+        global _active
+        self._started = started_at if started_at is not None else time.perf_counter()
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+        if self.use_cprofile:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        _active = self
+        return self
+
+    def stop(self):
+        """停止剖析"""
+        global _active
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self.use_tracemalloc:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self._tracemalloc_report = {
+                    "current_bytes": current,
+                    "peak_bytes": peak,
+                    "top": [
+                        {"location": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+                        for stat in snapshot.statistics("lineno")[:self.top]
+                    ],
+                }
+        self._stopped = time.perf_counter()
+        if _active is self:
+            _active = None
+
+    def __enter__(self):
+        if self._started is None:
+            self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _cprofile_report(self):
+        if self._cprofile is None:
+            return None
+        import pstats
+        stats = pstats.Stats(self._cprofile, stream=io.StringIO())
+        stats.sort_stats("cumulative")
+        functions = []
+        for func in stats.fcn_list[:self.top]:
+            _, total_calls, total_time, cumulative_time, _ = stats.stats[func]
+            filename, line, name = func
+            functions.append({
+                "function": f"{filename}:{line}({name})",
+                "calls": total_calls,
+                "total_seconds": total_time,
+                "cumulative_seconds": cumulative_time,
+            })
+        return {"top": functions}
+
+    def report(self, **extra):
+        """
+        生成机器可读的剖析报告
+
+        Args:
+            **extra: 附加字段 (如 action)
+
+        Returns:
+            dict: 报告
+        """
+        import platform
+        end = self._stopped if self._stopped is not None else time.perf_counter()
+        total = end - self._started
+        with self._lock:
+            phases = {name: dict(entry) for name, entry in self.phases.items()}
+
+        # startup 发生在计时起点之前，不参与 other 的计算
+        attributed = sum(entry["seconds"] for name, entry in phases.items() if name != "startup")
+        phases["other"] = {"seconds": max(0.0, total - attributed), "calls": 1}
+
+        report = dict(extra)
+        report.update({
+            "total_seconds": total,
+            "phases": {name: phases[name] for name in PHASES if name in phases},
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+        })
+        for name in sorted(set(phases) - set(PHASES)):
+            report["phases"][name] = phases[name]
+        cprofile_report = self._cprofile_report()
+        if cprofile_report is not None:
+            report["cprofile"] = cprofile_report
+        if self._tracemalloc_report is not None:
+            report["tracemalloc"] = self._tracemalloc_report
+        return report
+
+    def dump_stats(self, filename):
+        """将 cProfile 原始统计写入文件 (可用 pstats/snakeviz 查看)"""
+        if self._cprofile is None:
+            raise ValueError("未启用 cProfile")
+        self._cprofile.dump_stats(filename)
+
+    def format_summary(self, report=None):
+        """返回按阶段的耗时摘要文本"""
+        report = report or self.report()
+        total = report["total_seconds"]
+        lines = ["阶段耗时:"]
+        for name, entry in report["phases"].items():
+            share = entry["seconds"] / total * 100 if total and name != "startup" else 0.0
+            suffix = "" if name == "startup" else f" {share:5.1f}%"
+            lines.append(f"  {name:<10}{entry['seconds'] * 1e3:10.3f} 毫秒{suffix}")
+        lines.append(f"  {'total':<10}{total * 1e3:10.3f} 毫秒")
+        if "tracemalloc" in report:
+            lines.append(f"  内存峰值  {report['tracemalloc']['peak_bytes'] / 1024:10.1f} KB")
+        return "\n".join(lines)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地签名服务压测脚本
+多个保持连接的客户端线程并发请求签名服务，报告吞吐量与 p50/p99 延迟；
+未指定 --port 时在本进程内用临时密钥启动一个服务器
+
+用法:
+    python signing_load_test.py                        # 启动内置服务器并压测 /sign
+    python signing_load_test.py --port 8080 --endpoint verify --connections 16
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import threading
+import time
+
+from enhanced_rsa_tool import EnhancedRSATool
+import signing_server
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _build_request(host, port, endpoint, payload_size, mode):
+    """返回 (路径, 请求体, 请求头)"""
+    message = "m" * payload_size
+    headers = {"Content-Type": "application/json" if mode == "json" else "application/octet-stream"}
+    signature = None
+    if endpoint == "verify":
+        # 先向服务请求一个有效签名，压测时验证它
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        try:
+            connection.request("POST", "/sign", json.dumps({"message": message}),
+                               {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            signature = json.loads(response.read())["signature"]
+        finally:
+            connection.close()
+
+    if mode == "json":
+        payload = {"message": message}
+        if signature is not None:
+            payload["signature"] = signature
+        return f"/{endpoint}", json.dumps(payload).encode('utf-8'), headers
+    if signature is not None:
+        headers["X-Signature"] = signature
+    return f"/{endpoint}", message.encode('utf-8'), headers
+
+def run_load_test(host, port, endpoint="sign", connections=8, requests=2000, payload_size=64,
+                  mode="json", keep_alive=True):
+    """
+    对签名服务压测
+
+    Args:
+        host (str): 服务地址
+        port (int): 服务端口
+        endpoint (str): 压测的接口 (sign/verify/encrypt)
+        connections (int): 并发连接数
+        requests (int): 总请求数
+        payload_size (int): 消息长度 (字节)
+        mode (str): json 或 binary
+        keep_alive (bool): 是否复用连接；为 False 时每个请求新建连接
+
+    Returns:
+        dict: requests/ok/rejected/errors/seconds/throughput/p50_ms/p99_ms/max_ms
+    """
+    if endpoint not in signing_server.OPERATIONS:
+        raise ValueError(f"不支持的接口: {endpoint}")
+    path, body, headers = _build_request(host, port, endpoint, payload_size, mode)
+    per_connection = [requests // connections + (i < requests % connections)
+                      for i in range(connections)]
+    lock = threading.Lock()
+    latencies = []
+    counts = {"ok": 0, "rejected": 0, "errors": 0}
+
+    def client(count):
+        local_latencies = []
+        local_counts = {"ok": 0, "rejected": 0, "errors": 0}
+        connection = None
+        for _ in range(count):
+            if connection is None:
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+            started = time.perf_counter()
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = None
+                local_counts["errors"] += 1
+                continue
+            local_latencies.append(time.perf_counter() - started)
+            if status == 200:
+                local_counts["ok"] += 1
+            elif status == 503:
+                local_counts["rejected"] += 1
+            else:
+                local_counts["errors"] += 1
+            if not keep_alive or response.will_close:
+                connection.close()
+                connection = None
+        if connection is not None:
+            connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for name, value in local_counts.items():
+                counts[name] += value
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        list(executor.map(client, per_connection))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "ok": counts["ok"],
+        "rejected": counts["rejected"],
+        "errors": counts["errors"],
+        "seconds": elapsed,
+        "throughput": counts["ok"] / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "max_ms": latencies[-1] * 1e3 if latencies else 0.0,
+    }
+
+@contextlib.contextmanager
+def local_server(key_size=2048, **options):
+    """在本进程内用临时密钥启动签名服务器，产出 (主机, 端口, 服务器)"""
+    rsa_tool = EnhancedRSATool(key_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        rsa_tool.generate_key_pair(save_to_file=False)
+    server = signing_server.make_server(rsa_tool, "127.0.0.1", 0, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield host, port, server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+def format_result(result):
+    """返回一行压测结果摘要"""
+    return (f"{result['throughput']:9.1f} 请求/秒  p50 {result['p50_ms']:7.2f} 毫秒  "
+            f"p99 {result['p99_ms']:7.2f} 毫秒  最大 {result['max_ms']:7.2f} 毫秒  "
+            f"成功 {result['ok']}  拒绝 {result['rejected']}  错误 {result['errors']}")
+
+def main():
+    """主函数 - 命令行压测"""
+    parser = argparse.ArgumentParser(description="本地签名服务压测")
+    parser.add_argument("--host", default="127.0.0.1", help="服务地址")
+    parser.add_argument("--port", type=int, help="服务端口 (省略时在本进程内启动服务器)")
+    parser.add_argument("--endpoint", choices=signing_server.OPERATIONS, default="sign",
+                        help="压测的接口")
+    parser.add_argument("--connections", type=int, default=8, help="并发连接数")
+    parser.add_argument("--requests", type=int, default=2000, help="总请求数")
+    parser.add_argument("--payload-size", type=int, default=64, help="消息长度 (字节)")
+    parser.add_argument("--mode", choices=["json", "binary"], default="json", help="请求格式")
+    parser.add_argument("--no-keep-alive", action="store_true", help="每个请求新建连接")
+    parser.add_argument("--key-size", type=int, default=2048, help="内置服务器的密钥长度")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0, help="内置服务器的批处理窗口")
+    parser.add_argument("--queue-size", type=int, default=1024, help="内置服务器的队列上限")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+
+    args = parser.parse_args()
+    options = dict(endpoint=args.endpoint, connections=args.connections, requests=args.requests,
+                   payload_size=args.payload_size, mode=args.mode,
+                   keep_alive=not args.no_keep_alive)
+
+    if args.port is None:
+        with local_server(args.key_size, batch_window=args.batch_window_ms / 1000,
+                          queue_size=args.queue_size) as (host, port, server):
+            result = run_load_test(host, port, **options)
+            result["server"] = server.service.stats()
+    else:
+        result = run_load_test(args.host, args.port, **options)
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(f"{args.endpoint} ({args.mode}, {args.connections} 个连接, {args.requests} 个请求)")
+        print(format_result(result))
+        if "server" in result:
+            print(f"服务端平均批次大小: {result['server']['mean_batch_size']:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 HTTP 签名服务
+为只会说 HTTP 的同机/容器内客户端提供签名、验证和加密接口 (仅依赖标准库):
+
+    POST /sign      JSON {"message": "..."} -> {"signature": Base64, "fingerprint": ...}
+                    二进制 (application/octet-stream) 请求体为消息，响应体为原始签名，
+                    签名密钥的指纹放在 X-Key-Fingerprint 头
+    POST /verify    JSON {"message": "...", "signature": Base64} -> {"valid": true}
+                    二进制请求体为消息，签名放在 X-Signature 头 (Base64)；响应均为 JSON
+    POST /encrypt   JSON {"message": "..."} -> {"ciphertext": Base64}
+                    二进制请求体为明文，响应体为 RSA-OAEP 密文
+    GET  /health    健康检查；GET /stats 服务统计
+
+HTTP/1.1 连接默认保持 (keep-alive)，每个连接一个线程；请求不在连接线程中直接做
+RSA 运算，而是进入有界队列，由调度线程把已排队的请求合并成批次，按工作线程数切分后
+并行执行；队列已满时立即返回 503 (Retry-After)，而不是无限排队
+
+RSA 运算无法合并，批处理本身几乎不减少每个请求的计算量，它带来的是: 每批只读取一次
+密钥快照 (同一批的响应来自同一密钥)、调度开销按批次而非按请求计算，以及有界队列
+提供的背压；batch_window 默认 0，只合并已排队的请求，设置等待时间只会增加延迟
+"""
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import base64
+import binascii
+import json
+import os
+import queue
+import threading
+import time
+
+from key_utils import sign_bytes, verify_bytes
+
+OPERATIONS = ("sign", "verify", "encrypt")
+
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None
+)
+
+class ServiceOverloaded(RuntimeError):
+    """请求队列已满或服务已关闭，请求被拒绝 (对应 HTTP 503)"""
+
+class _Request:
+    __slots__ = ("operation", "data", "signature", "future")
+
+    def __init__(self, operation, data, signature):
+        self.operation = operation
+        self.data = data
+        self.signature = signature
+        self.future = Future()
+
+class SigningService:
+    """把并发的签名/验证/加密请求合并成批次，切分到工作线程池中并行执行"""
+
+    def __init__(self, rsa_tool, workers=None, batch_window=0.0, max_batch=32, queue_size=1024):
+        """
+        Args:
+            rsa_tool (EnhancedRSATool): 已加载密钥的工具实例 (密钥可在运行中重新加载)
+            workers (int): 工作线程数，默认 CPU 数
+            batch_window (float): 收到批次第一个请求后等待更多请求的时间 (秒)，0 表示只合并已排队的请求
+            max_batch (int): 每个批次的最大请求数 (批次再按工作线程数切分)
+            queue_size (int): 等待调度的请求上限，超出时拒绝新请求
+        """
+        if max_batch < 1 or queue_size < 1:
+            raise ValueError("max_batch 和 queue_size 必须至少为 1")
+        self.rsa_tool = rsa_tool
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        # 限制同时交给线程池的分片数，工作线程饱和时请求留在有界队列中，由队列负责拒绝
+        self._inflight = threading.BoundedSemaphore(self.workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="signing-worker")
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self._dispatcher = threading.Thread(target=self._dispatch, name="signing-dispatcher",
+                                            daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, operation, data, signature=None):
+        """
+        提交一个请求
+
+        Args:
+            operation (str): 操作，见 OPERATIONS
+            data (bytes): 消息或明文
+            signature (bytes): 待验证的签名 (verify)
+
+        Returns:
+            Future: 结果为 (签名所用密钥的指纹, 签名 bytes) / 验证结果 bool / 密文 bytes
+
+        Raises:
+            ServiceOverloaded: 队列已满或服务已关闭
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"不支持的操作: {operation}")
+        if operation == "verify" and signature is None:
+            raise ValueError("缺少签名")
+        if self._closed:
+            raise ServiceOverloaded("服务已关闭")
+        request = _Request(operation, data, signature)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise ServiceOverloaded("服务繁忙，请稍后重试")
+        with self._stats_lock:
+            self.requests += 1
+        return request.future
+
+    def _dispatch(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            stop = False
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        request = self._queue.get(timeout=remaining)
+                    else:
+                        request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+
+            with self._stats_lock:
+                self.batches += 1
+            # 整个批次使用同一个密钥快照，按工作线程数切分后并行执行
+            keys = self.rsa_tool.key_state
+            size = -(-len(batch) // self.workers)
+            for start in range(0, len(batch), size):
+                self._inflight.acquire()
+                self._executor.submit(self._run_batch, keys, batch[start:start + size])
+            if stop:
+                return
+
+    def _run_batch(self, keys, batch):
+        try:
+            for request in batch:
+                if not request.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    request.future.set_result(self._execute(keys, request))
+                except Exception as e:
+                    request.future.set_exception(e)
+        finally:
+            self._inflight.release()
+
+    def _execute(self, keys, request):
+        if request.operation == "sign":
+            if keys.private_key is None:
+                raise ValueError("请先加载私钥")
+            # 指纹取自签名所用的同一快照，并发重新加载密钥时也与签名一致
+            return keys.fingerprint, sign_bytes(keys.private_key, request.data)
+        if keys.public_key is None:
+            raise ValueError("请先加载公钥")
+        if request.operation == "verify":
+            return verify_bytes(keys.public_key, request.data, request.signature)
+        max_length = keys.public_key.key_size // 8 - 2 * hashes.SHA256.digest_size - 2
+        if len(request.data) > max_length:
+            raise ValueError(f"明文过长: {len(request.data)} 字节 (最多 {max_length} 字节)")
+        return keys.public_key.encrypt(request.data, _OAEP)
+
+    def stats(self):
+        """返回服务统计信息"""
+        with self._stats_lock:
+            requests, rejected, batches = self.requests, self.rejected, self.batches
+        return {
+            "requests": requests,
+            "rejected": rejected,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else 0.0,
+            "queued": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "workers": self.workers,
+        }
+
+    def close(self):
+        """停止接受新请求，执行完已排队的请求后关闭线程池"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+        # 与关闭并发提交、排在结束标记之后的请求不再执行
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None and request.future.set_running_or_notify_cancel():
+                request.future.set_exception(ServiceOverloaded("服务已关闭"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class _HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+class SigningRequestHandler(BaseHTTPRequestHandler):
+    """签名服务的 HTTP/1.1 请求处理器"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "RSASigningService/1.0"
+    # 响应头与响应体分两次写出，保持连接时 Nagle 算法与延迟确认叠加会让每个请求多等约 40 毫秒
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                   headers=headers)
+
+    def _read_body(self):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            raise _HTTPError(411, "缺少 Content-Length")
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # 负数长度会让 rfile.read 一直读到客户端关闭连接
+            self.close_connection = True
+            raise _HTTPError(400, "Content-Length 无效")
+        if length > self.server.max_body:
+            # 未读取的请求体会破坏后续请求的解析，直接关闭连接
+            self.close_connection = True
+            raise _HTTPError(413, f"请求体过大 (最多 {self.server.max_body} 字节)")
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        """健康检查与统计"""
+        if self.path == "/health":
+            fingerprint = self.server.service.rsa_tool.key_state.fingerprint
+            self._send_json(200, {"status": "ok", "fingerprint": fingerprint})
+        elif self.path == "/stats":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+
+    def do_POST(self):
+        """签名、验证与加密"""
+        try:
+            operation = self.path.lstrip("/")
+            if operation not in OPERATIONS:
+                self._read_body()
+                raise _HTTPError(404, f"未知路径: {self.path}")
+            body = self._read_body()
+            is_json = self.headers.get("Content-Type", "").split(";")[0].strip() == "application/json"
+            data, signature = self._parse(operation, body, is_json)
+
+            try:
+                future = self.server.service.submit(operation, data, signature)
+            except ServiceOverloaded as e:
+                raise _HTTPError(503, str(e), {"Retry-After": "1"})
+            try:
+                result = future.result(timeout=self.server.request_timeout)
+            except FutureTimeoutError:
+                raise _HTTPError(504, "请求处理超时")
+            except ValueError as e:
+                raise _HTTPError(400, str(e))
+            except Exception as e:
+                raise _HTTPError(500, f"处理失败: {e}")
+            self._respond(operation, result, is_json)
+        except _HTTPError as e:
+            self._send_json(e.status, {"error": str(e)}, e.headers)
+
+    def _parse(self, operation, body, is_json):
+        """返回 (数据, 签名)"""
+        signature = None
+        try:
+            if is_json:
+                payload = json.loads(body)
+                data = payload["message"].encode('utf-8')
+                if operation == "verify":
+                    signature = base64.b64decode(payload["signature"], validate=True)
+            else:
+                data = body
+                if operation == "verify":
+                    if "X-Signature" not in self.headers:
+                        raise ValueError("缺少 X-Signature 头")
+                    signature = base64.b64decode(self.headers["X-Signature"], validate=True)
+        except (ValueError, KeyError, TypeError, AttributeError, binascii.Error) as e:
+            raise _HTTPError(400, f"请求格式错误: {e}")
+        return data, signature
+
+    def _respond(self, operation, result, is_json):
+        if operation == "verify":
+            self._send_json(200, {"valid": result})
+        elif operation == "sign":
+            fingerprint, signature = result
+            if is_json:
+                self._send_json(200, {
+                    "signature": base64.b64encode(signature).decode('ascii'),
+                    "fingerprint": fingerprint,
+                })
+            else:
+                self._send(200, signature, "application/octet-stream",
+                           {"X-Key-Fingerprint": fingerprint})
+        elif not is_json:
+            self._send(200, result, "application/octet-stream")
+        else:
+            self._send_json(200, {"ciphertext": base64.b64encode(result).decode('ascii')})
+
+class SigningHTTPServer(ThreadingHTTPServer):
+    """每个连接一个线程的 HTTP 服务器，RSA 运算由 SigningService 批量执行"""
+
+    daemon_threads = True
+
+    def __init__(self, address, service, max_body=1024 * 1024, request_timeout=30.0,
+                 verbose=False):
+        """
+        Args:
+            address (tuple): (主机, 端口)，端口为 0 时自动分配
+            service (SigningService): 签名服务
+            max_body (int): 请求体最大字节数
+            request_timeout (float): 单个请求等待处理结果的最长时间 (秒)
+            verbose (bool): 是否输出访问日志
+        """
+        self.service = service
+        self.max_body = max_body
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+        super().__init__(address, SigningRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+
+def make_server(rsa_tool, host="127.0.0.1", port=8080, workers=None, batch_window=0.0,
+                max_batch=32, queue_size=1024, **options):
+    """
+    创建签名服务器 (调用 serve_forever() 开始服务)
+
+    Args:
+        rsa_tool (EnhancedRSATool): 已加载密钥的工具实例
+        host (str): 监听地址，默认只监听本机
+        port (int): 端口，0 表示自动分配
+        其余参数见 SigningService 与 SigningHTTPServer
+
+    Returns:
+        SigningHTTPServer: 服务器
+    """
+    service = SigningService(rsa_tool, workers, batch_window, max_batch, queue_size)
+    try:
+        return SigningHTTPServer((host, port), service, **options)
+    except BaseException:
+        service.close()
+        raise
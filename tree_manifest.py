@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录树签名清单
+并行计算目录树中每个文件的 SHA-256，写出按路径排序的清单，只对清单做一次
+sign_message 签名，代替逐个文件签名；再次签名时只重新计算大小或修改时间发生
+变化的文件，验证时同样并行计算摘要
+
+清单格式 (UTF-8 文本，路径使用 / 分隔，按路径排序):
+    # rsa-tree-manifest v1 generated_ns=<生成时间>
+    <sha256> <大小> <mtime_ns> <相对路径>
+
+签名消息为 "tree-manifest:v1:<清单的 SHA-256>"；签名文件保存原始签名字节
+符号链接和非普通文件不跟随、不计入清单
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import time
+
+from durable_io import PUBLIC_FILE_MODE
+import durable_io
+from key_utils import verify_text
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "MANIFEST.sha256"
+SIGNATURE_SUFFIX = ".sig"
+
+_HEADER_PREFIX = f"# rsa-tree-manifest v{MANIFEST_VERSION} generated_ns="
+_READ_SIZE = 1024 * 1024
+# 修改时间距上次生成清单不足该值的文件不复用摘要，避免同一时间戳粒度内的修改被漏掉
+_RACY_WINDOW_NS = 2 * 10 ** 9
+
+# 清单条目: path 为相对路径 (/ 分隔)
+ManifestEntry = namedtuple("ManifestEntry", ["path", "size", "mtime_ns", "digest"])
+
+# 验证结果: modified/missing/added 为相对路径列表
+TreeReport = namedtuple("TreeReport", ["valid", "signature_valid", "modified", "missing", "added"])
+
+def hash_file(filename):
+    """
+    计算文件的 SHA-256 (分块读取；hashlib 处理大块数据时释放 GIL，可在线程中并行)
+
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _map_parallel(func, items, max_workers):
+    """按顺序返回 func(item) 的结果；max_workers 为 1 或任务很少时不创建线程池"""
+    items = list(items)
+    if max_workers == 1 or len(items) < 2:
+        return [func(item) for item in items]
+    workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+def scan_tree(root, exclude=()):
+    """
+    列出目录树中的普通文件
+
+    Args:
+        root (str): 根目录
+        exclude (iterable): 要跳过的文件 (绝对或相对当前目录的路径)，如清单与签名文件
+
+    Returns:
+        list: 按相对路径排序的 (相对路径, os.stat_result)
+    """
+    if not os.path.isdir(root):
+        raise ValueError(f"目录不存在: {root}")
+    excluded = {os.path.abspath(path) for path in exclude}
+    files = []
+    pending = [(root, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, relative + "/"))
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if os.path.abspath(entry.path) in excluded:
+                    continue
+                if "\n" in relative or "\r" in relative:
+                    raise ValueError(f"不支持包含换行符的文件名: {relative!r}")
+                files.append((relative, entry.stat(follow_symlinks=False)))
+    files.sort(key=lambda item: item[0])
+    return files
+
+def format_manifest(entries, generated_ns):
+    """序列化清单 (entries 须已按路径排序)"""
+    lines = [f"{_HEADER_PREFIX}{generated_ns}"]
+    for entry in entries:
+        lines.append(f"{entry.digest} {entry.size} {entry.mtime_ns} {entry.path}")
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+def parse_manifest(data):
+    """
+    解析清单
+
+    Returns:
+        tuple: (生成时间 ns, ManifestEntry 列表)
+    """
+    lines = data.decode('utf-8').split("\n")
+    if not lines or not lines[0].startswith(_HEADER_PREFIX):
+        raise ValueError("不是有效的目录树清单")
+    try:
+        generated_ns = int(lines[0][len(_HEADER_PREFIX):])
+        entries = []
+        for line in lines[1:]:
+            if not line:
+                continue
+            digest, size, mtime_ns, path = line.split(" ", 3)
+            if len(digest) != 64:
+                raise ValueError(f"无效的摘要: {digest}")
+            entries.append(ManifestEntry(path, int(size), int(mtime_ns), digest))
+    except ValueError as e:
+        raise ValueError(f"清单格式错误: {e}")
+    return generated_ns, entries
+
+def manifest_message(manifest_data):
+    """清单对应的签名消息"""
+    return f"tree-manifest:v{MANIFEST_VERSION}:{hashlib.sha256(manifest_data).hexdigest()}"
+
+def _default_paths(root, manifest_file, signature_file):
+    manifest_file = manifest_file or os.path.join(root, MANIFEST_FILENAME)
+    signature_file = signature_file or manifest_file + SIGNATURE_SUFFIX
+    return manifest_file, signature_file
+
+def _read_signed_manifest(public_key, manifest_file, signature_file):
+    """读取清单及签名，返回 (清单数据, 签名是否有效)；文件不存在时返回 (None, False)"""
+    try:
+        with open(manifest_file, 'rb') as f:
+            manifest_data = f.read()
+        with open(signature_file, 'rb') as f:
+            signature = f.read()
+    except FileNotFoundError:
+        return None, False
+    return manifest_data, verify_text(public_key, manifest_message(manifest_data), signature)
+
+def build_manifest(root, previous=None, max_workers=None, exclude=()):
+    """
+    计算目录树的清单条目
+
+    Args:
+        root (str): 根目录
+        previous (tuple): 上次的 (生成时间 ns, 条目列表)；大小与修改时间均未变化的文件直接复用摘要
+        max_workers (int): 哈希线程数，为 1 时不使用线程池
+        exclude (iterable): 要跳过的文件
+
+    Returns:
+        tuple: (生成时间 ns, 条目列表, 统计信息)
+    """
+    generated_ns = time.time_ns()
+    files = scan_tree(root, exclude)
+
+    known = {}
+    if previous is not None:
+        previous_ns, previous_entries = previous
+        known = {
+            entry.path: entry for entry in previous_entries
+            if entry.mtime_ns < previous_ns - _RACY_WINDOW_NS
+        }
+
+    entries = []
+    to_hash = []
+    for relative, st in files:
+        entry = known.get(relative)
+        if entry is not None and entry.size == st.st_size and entry.mtime_ns == st.st_mtime_ns:
+            entries.append(entry)
+        else:
+            entries.append(None)
+            to_hash.append((len(entries) - 1, relative, st))
+
+    digests = _map_parallel(
+        lambda item: hash_file(os.path.join(root, item[1])), to_hash, max_workers
+    )
+    for (position, relative, st), digest in zip(to_hash, digests):
+        entries[position] = ManifestEntry(relative, st.st_size, st.st_mtime_ns, digest)
+
+    stats = {
+        "files": len(entries),
+        "hashed": len(to_hash),
+        "reused": len(entries) - len(to_hash),
+        "bytes_hashed": sum(st.st_size for _, _, st in to_hash),
+    }
+    return generated_ns, entries, stats
+
+def sign_tree(rsa_tool, root, manifest_file=None, signature_file=None, max_workers=None,
+              incremental=True, writer=None):
+    """
+    为目录树生成清单并签名一次
+
+    Args:
+        rsa_tool (EnhancedRSATool): 已加载私钥的工具实例
+        root (str): 根目录
+        manifest_file (str): 清单路径，默认 <root>/MANIFEST.sha256
+        signature_file (str): 签名路径，默认 <清单路径>.sig
+        max_workers (int): 哈希线程数
+        incremental (bool): 是否复用上次清单中未变化文件的摘要 (仅当上次清单的签名
+            能用当前公钥验证通过时)
+        writer (DurableWriter): 文件写入器
+
+    Returns:
+        dict: 统计信息 (files/hashed/reused/bytes_hashed/manifest/signature)
+    """
+    manifest_file, signature_file = _default_paths(root, manifest_file, signature_file)
+    previous = None
+    if incremental:
+        manifest_data, trusted = _read_signed_manifest(
+            rsa_tool.public_key, manifest_file, signature_file
+        )
+        if trusted:
+            try:
+                previous = parse_manifest(manifest_data)
+            except ValueError:
+                previous = None
+
+    generated_ns, entries, stats = build_manifest(
+        root, previous, max_workers, exclude=(manifest_file, signature_file)
+    )
+    manifest_data = format_manifest(entries, generated_ns)
+    signature = rsa_tool.sign_message(manifest_message(manifest_data))
+
+    with durable_io.batch(writer) as batch_writer:
+        batch_writer.write(manifest_file, manifest_data, PUBLIC_FILE_MODE)
+        batch_writer.write(signature_file, signature, PUBLIC_FILE_MODE)
+
+    stats.update({"manifest": manifest_file, "signature": signature_file})
+    return stats
+
+def verify_tree(public_key, root, manifest_file=None, signature_file=None, max_workers=None):
+    """
+    验证目录树与签名清单一致：先验证清单签名，再并行重新计算所有文件的摘要
+
+    Args:
+        public_key: 签名方的 RSA 公钥对象
+        root (str): 根目录
+        manifest_file (str): 清单路径，默认 <root>/MANIFEST.sha256
+        signature_file (str): 签名路径，默认 <清单路径>.sig
+        max_workers (int): 哈希线程数
+
+    Returns:
+        TreeReport: 验证结果
+    """
+    manifest_file, signature_file = _default_paths(root, manifest_file, signature_file)
+    manifest_data, signature_valid = _read_signed_manifest(public_key, manifest_file, signature_file)
+    if manifest_data is None:
+        raise ValueError(f"清单或签名文件不存在: {manifest_file}")
+    if not signature_valid:
+        return TreeReport(False, False, [], [], [])
+
+    _, entries = parse_manifest(manifest_data)
+    expected = {entry.path: entry for entry in entries}
+    files = dict(scan_tree(root, exclude=(manifest_file, signature_file)))
+
+    missing = sorted(path for path in expected if path not in files)
+    added = sorted(path for path in files if path not in expected)
+    modified = []
+    to_hash = []
+    for path in sorted(set(expected) & set(files)):
+        # 大小不同时无需计算摘要
+        if files[path].st_size != expected[path].size:
+            modified.append(path)
+        else:
+            to_hash.append(path)
+
+    digests = _map_parallel(lambda path: hash_file(os.path.join(root, path)), to_hash, max_workers)
+    modified.extend(path for path, digest in zip(to_hash, digests) if digest != expected[path].digest)
+    modified.sort()
+
+    valid = not (modified or missing or added)
+    return TreeReport(valid, True, modified, missing, added)
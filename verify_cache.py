@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+签名验证结果缓存
+以 (公钥指纹, 消息摘要, 签名摘要) 为键记住验证成功的结果，
+重复验证同一签名时只需一次字典查找；带 TTL、LRU 淘汰、内存上限和命中率统计
+
+只缓存验证成功的结果：失败结果不缓存，避免攻击者用大量伪造签名挤占缓存
+"""
+
+from collections import OrderedDict
+import hashlib
+import sys
+import threading
+import time
+
+from key_utils import public_key_der
+
+# 单个条目的估算内存: 96 字节键对象 + 过期时间 float + OrderedDict 链表节点与哈希槽
+ENTRY_SIZE_ESTIMATE = sys.getsizeof(b"\0" * 96) + sys.getsizeof(0.0) + 104
+
+# 公钥对象到指纹的小型映射上限，避免每次验证都重新序列化公钥
+_FINGERPRINT_SLOTS = 64
+
+class VerificationCache:
+    """签名验证成功结果的有界缓存 (线程安全)"""
+
+    def __init__(self, max_entries=100000, ttl=300, max_bytes=None, clock=time.monotonic):
+        """
+        Args:
+            max_entries (int): 最多缓存的条目数
+            ttl (float): 条目有效期 (秒)
+            max_bytes (int): 估算内存上限，设置后与 max_entries 取较小的容量
+            clock (callable): 单调时钟，便于测试注入
+        """
+        if max_bytes is not None:
+            max_entries = min(max_entries, max_bytes // ENTRY_SIZE_ESTIMATE)
+        if max_entries < 1:
+            raise ValueError("缓存容量必须至少为 1")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def fingerprint_for(self, public_key):
+        """获取公钥的原始 SHA-256 指纹，对最近使用的公钥对象做记忆"""
+        slot = id(public_key)
+        with self._lock:
+            cached = self._fingerprints.get(slot)
+            # 同时保存公钥对象本身，防止 id 被回收后复用
+            if cached is not None and cached[0] is public_key:
+                self._fingerprints.move_to_end(slot)
+                return cached[1]
+
+        fingerprint = hashlib.sha256(public_key_der(public_key)).digest()
+        with self._lock:
+            self._fingerprints[slot] = (public_key, fingerprint)
+            while len(self._fingerprints) > _FINGERPRINT_SLOTS:
+                self._fingerprints.popitem(last=False)
+        return fingerprint
+
+    @staticmethod
+    def make_key(fingerprint, message_digest, signature):
+        """
+        组合缓存键
+
+        Args:
+            fingerprint (bytes): 公钥原始指纹
+            message_digest (bytes): 消息摘要
+            signature (bytes): 签名
+
+        Returns:
+            bytes: 96 字节缓存键
+        """
+        return fingerprint + message_digest + hashlib.sha256(signature).digest()
+
+    def lookup(self, key):
+        """查询缓存键是否对应一个仍在有效期内的成功验证"""
+        now = self._clock()
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                self.misses += 1
+                return False
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def store(self, key):
+        """记录一次成功验证"""
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = expires_at
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存 (例如公钥被吊销时)"""
+        with self._lock:
+            self._entries.clear()
+            self._fingerprints.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """返回缓存统计信息"""
+        entries = len(self)
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "approx_bytes": entries * ENTRY_SIZE_ESTIMATE,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+X.509 证书签名请求与本地 CA 证书签发
+基于 EnhancedRSATool 的密钥对象生成 CSR、创建本地 CA，并支持按模板在进程池中
+批量签发叶子证书；CA 的编码材料只序列化一次，工作进程启动时加载一次后复用
+"""
+
+from cryptography import x509
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from datetime import datetime, timedelta, timezone
+import os
+
+from durable_io import PRIVATE_FILE_MODE, PUBLIC_FILE_MODE
+import durable_io
+import key_vault
+
+_NAME_ATTRIBUTES = {
+    "common_name": NameOID.COMMON_NAME,
+    "organization": NameOID.ORGANIZATION_NAME,
+    "organizational_unit": NameOID.ORGANIZATIONAL_UNIT_NAME,
+    "country": NameOID.COUNTRY_NAME,
+    "state": NameOID.STATE_OR_PROVINCE_NAME,
+    "locality": NameOID.LOCALITY_NAME,
+}
+
+# 每个进程池任务处理的证书数量，减少进程间通信次数
+_BATCH_CHUNK_SIZE = 64
+
+def build_name(common_name, **attributes):
+    """
+    构造 X.509 名称
+
+    Args:
+        common_name (str): 通用名 (CN)
+        **attributes: organization、country 等其他名称属性
+
+    Returns:
+        x509.Name: 名称对象
+    """
+    parts = [x509.NameAttribute(NameOID.COMMON_NAME, common_name)]
+    for name, value in attributes.items():
+        if name not in _NAME_ATTRIBUTES or name == "common_name":
+            raise ValueError(f"不支持的名称属性: {name}")
+        if value:
+            parts.append(x509.NameAttribute(_NAME_ATTRIBUTES[name], value))
+    return x509.Name(parts)
+
+def create_csr(private_key, common_name, dns_names=None, **attributes):
+    """
+    生成证书签名请求 (CSR)
+
+    Args:
+        private_key: RSA 私钥对象
+        common_name (str): 通用名
+        dns_names (list): 主题备用名称中的 DNS 名称
+        **attributes: 其他名称属性
+
+    Returns:
+        x509.CertificateSigningRequest: CSR 对象
+    """
+    builder = x509.CertificateSigningRequestBuilder().subject_name(
+        build_name(common_name, **attributes)
+    )
+    if dns_names:
+        builder = builder.add_extension(
+            x509.SubjectAlternativeName([x509.DNSName(name) for name in dns_names]),
+            critical=False
+        )
+    return builder.sign(private_key, hashes.SHA256())
+
+class CertificateTemplate:
+    """叶子证书模板，名称中的 {index} 会被替换为批量签发的序号"""
+
+    def __init__(self, common_name="leaf-{index}", dns_names=None, valid_days=365,
+                 organization=None, server_auth=True, client_auth=False):
+        """
+        Args:
+            common_name (str): 通用名模板，为 None 时使用 CSR 中的主题
+            dns_names (list): DNS 名称模板列表
+            valid_days (int): 有效天数
+            organization (str): 组织名称
+            server_auth (bool): 是否允许用于服务器认证
+            client_auth (bool): 是否允许用于客户端认证
+        """
+        self.common_name = common_name
+        self.dns_names = list(dns_names or [])
+        self.valid_days = valid_days
+        self.organization = organization
+        self.server_auth = server_auth
+        self.client_auth = client_auth
+
+    def subject(self, index, csr=None):
+        """生成第 index 张证书的主题"""
+        if self.common_name is None:
+            if csr is None:
+                raise ValueError("模板未指定通用名时必须提供 CSR")
+            return csr.subject
+        return build_name(self.common_name.format(index=index), organization=self.organization)
+
+    def extensions(self, index):
+        """生成第 index 张证书的扩展 (extension, critical) 列表"""
+        extensions = [
+            (x509.BasicConstraints(ca=False, path_length=None), True),
+            (x509.KeyUsage(
+                digital_signature=True, content_commitment=False, key_encipherment=True,
+                data_encipherment=False, key_agreement=False, key_cert_sign=False,
+                crl_sign=False, encipher_only=False, decipher_only=False
+            ), True),
+        ]
+        usages = []
+        if self.server_auth:
+            usages.append(ExtendedKeyUsageOID.SERVER_AUTH)
+        if self.client_auth:
+            usages.append(ExtendedKeyUsageOID.CLIENT_AUTH)
+        if usages:
+            extensions.append((x509.ExtendedKeyUsage(usages), False))
+        if self.dns_names:
+            extensions.append((x509.SubjectAlternativeName(
+                [x509.DNSName(name.format(index=index)) for name in self.dns_names]
+            ), False))
+        return extensions
+
+class LocalCA:
+    """本地证书颁发机构"""
+
+    def __init__(self, private_key, certificate):
+        """
+        Args:
+            private_key: CA 的 RSA 私钥对象
+            certificate (x509.Certificate): CA 证书
+        """
+        self.private_key = private_key
+        self.certificate = certificate
+        # 每张叶子证书都要用到的签发者信息，只计算一次
+        self._issuer_name = certificate.subject
+        self._authority_key_id = x509.AuthorityKeyIdentifier.from_issuer_subject_key_identifier(
+            x509.SubjectKeyIdentifier.from_public_key(private_key.public_key())
+        )
+        self._certificate_der = None
+        self._private_key_der = None
+
+    @classmethod
+    def create(cls, private_key, common_name, valid_days=3650, **attributes):
+        """
+        使用给定私钥创建自签名 CA
+
+        Args:
+            private_key: CA 的 RSA 私钥对象
+            common_name (str): CA 通用名
+            valid_days (int): 有效天数
+            **attributes: 其他名称属性
+
+        Returns:
+            LocalCA: 本地 CA
+        """
+        name = build_name(common_name, **attributes)
+        public_key = private_key.public_key()
+        now = datetime.now(timezone.utc)
+        certificate = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(public_key)
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(minutes=5))
+            .not_valid_after(now + timedelta(days=valid_days))
+            .add_extension(x509.BasicConstraints(ca=True, path_length=0), critical=True)
+            .add_extension(x509.KeyUsage(
+                digital_signature=True, content_commitment=False, key_encipherment=False,
+                data_encipherment=False, key_agreement=False, key_cert_sign=True,
+                crl_sign=True, encipher_only=False, decipher_only=False
+            ), critical=True)
+            .add_extension(x509.SubjectKeyIdentifier.from_public_key(public_key), critical=False)
+            .sign(private_key, hashes.SHA256())
+        )
+        return cls(private_key, certificate)
+
+    @classmethod
+    def load(cls, key_filename, cert_filename, password=None):
+        """从 PEM 文件加载 CA 私钥和证书"""
+        private_key = key_vault.load_pem_private_key_file(key_filename, password)
+        with open(cert_filename, 'rb') as f:
+            certificate = x509.load_pem_x509_certificate(f.read())
+        return cls(private_key, certificate)
+
+    @property
+    def certificate_der(self):
+        """CA 证书的 DER 编码 (只序列化一次)"""
+        if self._certificate_der is None:
+            self._certificate_der = self.certificate.public_bytes(serialization.Encoding.DER)
+        return self._certificate_der
+
+    @property
+    def private_key_der(self):
+        """CA 私钥的 PKCS#8 DER 编码 (只序列化一次，供工作进程加载)"""
+        if self._private_key_der is None:
+            self._private_key_der = self.private_key.private_bytes(
+                encoding=serialization.Encoding.DER,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            )
+        return self._private_key_der
+
+    def save(self, key_filename, cert_filename, password=None,
+             kdf_rounds=key_vault.DEFAULT_KDF_ROUNDS, writer=None):
+        """持久化地保存 CA 私钥 (0600) 和证书为 PEM 文件"""
+        with durable_io.batch(writer) as batch_writer:
+            batch_writer.write(
+                key_filename, key_vault.private_key_to_pem(self.private_key, password, kdf_rounds),
+                PRIVATE_FILE_MODE
+            )
+            batch_writer.write(
+                cert_filename, self.certificate.public_bytes(serialization.Encoding.PEM),
+                PUBLIC_FILE_MODE
+            )
+
+    def issue(self, subject_key, template=None, index=0):
+        """
+        签发一张叶子证书
+
+        Args:
+            subject_key: 叶子证书的 RSA 公钥对象或 CSR
+            template (CertificateTemplate): 证书模板
+            index (int): 模板中 {index} 的取值
+
+        Returns:
+            x509.Certificate: 签发的证书
+        """
+        template = template or CertificateTemplate()
+        csr = None
+        if isinstance(subject_key, x509.CertificateSigningRequest):
+            csr = subject_key
+            if not csr.is_signature_valid:
+                raise ValueError("CSR 签名无效")
+            public_key = csr.public_key()
+        else:
+            public_key = subject_key
+
+        now = datetime.now(timezone.utc)
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(template.subject(index, csr))
+            .issuer_name(self._issuer_name)
+            .public_key(public_key)
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(minutes=5))
+            .not_valid_after(now + timedelta(days=template.valid_days))
+            .add_extension(self._authority_key_id, critical=False)
+        )
+        for extension, critical in template.extensions(index):
+            builder = builder.add_extension(extension, critical=critical)
+        return builder.sign(self.private_key, hashes.SHA256())
+
+# 工作进程内缓存的 CA，由进程池初始化函数加载一次
+_worker_ca = None
+_worker_template = None
+
+def _init_worker(private_key_der, certificate_der, template):
+    global _worker_ca, _worker_template
+    # CA 私钥来自父进程的已加载对象，无需重复执行耗时的一致性检查
+    private_key = serialization.load_der_private_key(
+        private_key_der, password=None, unsafe_skip_rsa_key_validation=True
+    )
+    _worker_ca = LocalCA(private_key, x509.load_der_x509_certificate(certificate_der))
+    _worker_template = template
+
+def _issue_chunk(items, ca=None, template=None):
+    """签发一批证书 (默认使用工作进程缓存的 CA 和模板)，返回 [(index, PEM)]"""
+    ca = ca or _worker_ca
+    template = template or _worker_template
+    results = []
+    for index, kind, der in items:
+        if kind == "csr":
+            subject_key = x509.load_der_x509_csr(der)
+        else:
+            subject_key = serialization.load_der_public_key(der)
+        certificate = ca.issue(subject_key, template, index)
+        results.append((index, certificate.public_bytes(serialization.Encoding.PEM)))
+    return results
+
+def _encode_subject(item):
+    """将公钥或 CSR 编码为可跨进程传递的 (类型, DER)"""
+    if isinstance(item, x509.CertificateSigningRequest):
+        return "csr", item.public_bytes(serialization.Encoding.DER)
+    if isinstance(item, bytes):
+        return "public_key", item
+    return "public_key", item.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+def _chunks(subjects, chunk_size):
+    chunk = []
+    for index, item in enumerate(subjects):
+        kind, der = _encode_subject(item)
+        chunk.append((index, kind, der))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_issue_batch(ca, subjects, template=None, processes=None, chunk_size=_BATCH_CHUNK_SIZE):
+    """
+    按模板批量签发证书，按输入顺序流式产出结果
+
+    Args:
+        ca (LocalCA): 本地 CA
+        subjects (iterable): 公钥对象、DER 公钥或 CSR
+        template (CertificateTemplate): 证书模板
+        processes (int): 进程数，为 1 时在当前进程中签发
+        chunk_size (int): 每个进程池任务处理的证书数量
+
+    Yields:
+        tuple: (序号, PEM 编码的证书)
+    """
+    template = template or CertificateTemplate()
+
+    if processes == 1:
+        for chunk in _chunks(subjects, chunk_size):
+            yield from _issue_chunk(chunk, ca, template)
+        return
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(ca.private_key_der, ca.certificate_der, template)
+    ) as executor:
+        # 限制在途任务数量，输入可以是任意长的迭代器
+        pending = deque()
+        for chunk in _chunks(subjects, chunk_size):
+            pending.append(executor.submit(_issue_chunk, chunk))
+            if len(pending) >= processes * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+def issue_batch(ca, subjects, out, template=None, processes=None, chunk_size=_BATCH_CHUNK_SIZE):
+    """
+    批量签发证书并把 PEM 依次写入输出流
+
+    Args:
+        ca (LocalCA): 本地 CA
+        subjects (iterable): 公钥对象、DER 公钥或 CSR
+        out: 可写的二进制文件对象
+        template (CertificateTemplate): 证书模板
+        processes (int): 进程数
+        chunk_size (int): 每个进程池任务处理的证书数量
+
+    Returns:
+        int: 签发的证书数量
+    """
+    count = 0
+    for _, pem in iter_issue_batch(ca, subjects, template, processes, chunk_size):
+        out.write(pem)
+        count += 1
+    return count